@@ -6,7 +6,9 @@ import re
 
 class Reminder:
     def __init__(self):
-        self.reminders = []
+        self.reminders = []  # (message, due time.time()) still pending
+        self._lock = threading.Lock()
+        self.listeners = []  # listener(message), called when a reminder fires
 
     # -----------------------------
     # PUBLIC METHOD
@@ -24,17 +26,26 @@ class Reminder:
             return False, "Could not understand reminder time."
 
         message, delay = parsed
+        entry = (message, time.time() + delay)
+        with self._lock:
+            self.reminders.append(entry)
 
         thread = threading.Thread(
             target=self._reminder_thread,
-            args=(message, delay),
+            args=(entry, delay),
             daemon=True
         )
         thread.start()
 
-        self.reminders.append((message, delay))
         return True, f"Reminder set for {message}"
 
+    def list_reminders(self):
+        """Pending reminders as (message, seconds left), soonest first."""
+        now = time.time()
+        with self._lock:
+            pending = sorted(self.reminders, key=lambda r: r[1])
+        return [(message, max(0, int(due - now))) for message, due in pending]
+
     # -----------------------------
     # TEXT PARSER
     # -----------------------------
@@ -70,9 +81,17 @@ class Reminder:
     # -----------------------------
     # BACKGROUND TIMER
     # -----------------------------
-    def _reminder_thread(self, message, delay):
+    def _reminder_thread(self, entry, delay):
         time.sleep(delay)
-        self._show_popup(message)
+        with self._lock:
+            if entry in self.reminders:
+                self.reminders.remove(entry)
+        for listener in list(self.listeners):
+            try:
+                listener(entry[0])
+            except Exception as e:
+                print(f"Reminder listener error: {e}")
+        self._show_popup(entry[0])
 
     # -----------------------------
     # POPUP
@@ -1,8 +1,21 @@
 import os
-import json
+import sys
 import datetime
 import re
+import json
+import queue
+import asyncio
+import hashlib
+import threading
+import time
 from dotenv import dotenv_values
+import metrics
+from memory_store import MemoryStore
+from conversation_journal import ConversationJournal
+from fact_extractor import FactExtractor
+from circuit_breaker import get_breaker
+from response_cache import ResponseCache
+from session_store import SessionStore, DEFAULT_SESSION
 
 # ===============================
 # LOAD ENV
@@ -17,21 +30,170 @@ GROQ_API_KEY = env.get("GROQ_API_KEY")
 OPENAI_API_KEY = env.get("OPENAI_API_KEY")
 COHERE_API_KEY = env.get("COHERE_API_KEY")
 
+# Provider resilience: seconds before a hedged request goes to the next
+# provider when the current one has not produced a first token (0 = off)
+HEDGE_DELAY = float(env.get("HedgeDelay", "0") or 0)
+PROVIDER_TIMEOUT = float(env.get("ProviderTimeout", "30") or 30)
+
+# Async path: in-flight LLM calls allowed at once, and the size of the
+# shared keep-alive connection pool used by the async provider clients
+MAX_CONCURRENT_LLM = int(env.get("MaxConcurrentLLM", "64") or 64)
+HTTP_MAX_CONNECTIONS = int(env.get("HttpMaxConnections", "100") or 100)
+
+# Journal retention (0 = unlimited): same age limit as the history database,
+# applied whenever the journal is compacted
+JOURNAL_RETENTION_DAYS = int(env.get("HistoryRetentionDays", "0") or 0)
+JOURNAL_MAX_ENTRIES = int(env.get("JournalMaxEntries", "0") or 0)
+
 # ===============================
-# CLIENT IMPORTS
+# METRICS
 # ===============================
-from google import genai
-from groq import Groq
-from openai import OpenAI
-import cohere
+FACT_SECONDS = metrics.histogram(
+    "tron_fact_extraction_seconds", "AutoExtractFacts duration")
+MODEL_ATTEMPT_SECONDS = metrics.histogram(
+    "tron_model_attempt_seconds", "One provider/model call, request to last chunk",
+    ("provider", "model", "outcome"))
+MODEL_FIRST_TOKEN_SECONDS = metrics.histogram(
+    "tron_model_first_token_seconds", "Time from request to first streamed chunk",
+    ("provider", "model"))
+PROVIDER_FALLBACKS = metrics.counter(
+    "tron_provider_fallbacks_total", "Failures handed over to the next model/provider",
+    ("provider",))
+PROVIDER_HEDGES = metrics.counter(
+    "tron_provider_hedges_total", "Hedged requests started because no first token arrived",
+    ("provider",))
+
+
+class ModelAttempt:
+    """
+    with ModelAttempt(provider, model) as attempt: ... around one model
+    call; call attempt.first_token() when text arrives. Records latency and
+    outcome (ok / error / cancelled when the stream is closed or the task
+    cancelled by a winning hedge).
+    """
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self.started = None
+        self._first = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def first_token(self):
+        if not self._first:
+            self._first = True
+            MODEL_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - self.started,
+                                              provider=self.provider, model=self.model)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            outcome = "cancelled"
+        else:
+            outcome = "error"
+        MODEL_ATTEMPT_SECONDS.observe(time.perf_counter() - self.started,
+                                      provider=self.provider, model=self.model, outcome=outcome)
+        return False
 
 # ===============================
-# INIT CLIENTS
+# LAZY CLIENTS
 # ===============================
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-groq_client = Groq(api_key=GROQ_API_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-cohere_client = cohere.Client(api_key=COHERE_API_KEY)
+# Provider SDKs are heavy to import; each one is imported and constructed
+# the first time that provider is actually used.
+def _MakeGeminiClient():
+    from google import genai
+    return genai.Client(api_key=GEMINI_API_KEY, http_options={"timeout": int(PROVIDER_TIMEOUT * 1000)})
+
+
+def _MakeGroqClient():
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY, timeout=PROVIDER_TIMEOUT, max_retries=0)
+
+
+def _MakeOpenAIClient():
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY, timeout=PROVIDER_TIMEOUT, max_retries=0)
+
+
+def _MakeCohereClient():
+    import cohere
+    return cohere.Client(api_key=COHERE_API_KEY, timeout=PROVIDER_TIMEOUT)
+
+
+CLIENT_FACTORIES = {
+    "gemini": _MakeGeminiClient,
+    "groq": _MakeGroqClient,
+    "openai": _MakeOpenAIClient,
+    "cohere": _MakeCohereClient,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _MakeHttpPool():
+    """One httpx.AsyncClient (HTTP/2 when `h2` is installed) shared by all async providers."""
+    import httpx
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=PROVIDER_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=60
+        )
+    )
+
+
+def _MakeAsyncGroqClient():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=GROQ_API_KEY, http_client=GetClient("http"), max_retries=0)
+
+
+def _MakeAsyncOpenAIClient():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=GetClient("http"), max_retries=0)
+
+
+def _MakeAsyncCohereClient():
+    import cohere
+    return cohere.AsyncClient(api_key=COHERE_API_KEY, httpx_client=GetClient("http"), timeout=PROVIDER_TIMEOUT)
+
+
+CLIENT_FACTORIES.update({
+    "http": _MakeHttpPool,
+    "async_groq": _MakeAsyncGroqClient,
+    "async_openai": _MakeAsyncOpenAIClient,
+    "async_cohere": _MakeAsyncCohereClient,
+})
+
+
+def GetClient(name):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = CLIENT_FACTORIES[name]()
+                _clients[name] = client
+    return client
+
+
+async def CloseAsyncClients():
+    pool = _clients.pop("http", None)
+    for name in ("async_groq", "async_openai", "async_cohere"):
+        _clients.pop(name, None)
+    if pool is not None:
+        await pool.aclose()
 
 # ===============================
 # SYSTEM PROMPT
@@ -49,70 +211,109 @@ SYSTEM_PROMPT = (
 # ===============================
 # MEMORY PATH
 # ===============================
-BASE_DIR = r"D:\project\ai assistent\Backend"
+# TRON_DATA_DIR overrides the location (benchmarks run in a temp directory)
+BASE_DIR = os.environ.get("TRON_DATA_DIR", r"D:\project\ai assistent\Backend")
 MEMORY_FILE = os.path.join(BASE_DIR, "conversation_log.json")
+JOURNAL_FILE = os.path.join(BASE_DIR, "conversation_log.jsonl")
+
+# Facts: loaded once, kept in RAM, flushed in the background (see memory_store.py)
+memory_store = MemoryStore(MEMORY_FILE)
+# Conversations: append-only journal (see conversation_journal.py)
+def _WithinRetention(entry):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=JOURNAL_RETENTION_DAYS)
+    return entry.get("time", "9999") >= cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+
+journal = ConversationJournal(
+    JOURNAL_FILE,
+    max_entries=JOURNAL_MAX_ENTRIES or None,
+    keep=_WithinRetention if JOURNAL_RETENTION_DAYS else None
+)
 
 # ===============================
 # MEMORY CORE
 # ===============================
 def LoadMemory():
-    if not os.path.exists(MEMORY_FILE):
-        return {"facts": {}, "conversations": []}
-    with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-        memory = json.load(f)
-    memory.setdefault("facts", {})
-    memory.setdefault("conversations", [])
-    return memory
+    return memory_store.data
+
 
+def SaveMemory(memory=None):
+    memory_store.mark_dirty()
 
-def SaveMemory(memory):
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(memory, f, indent=4, ensure_ascii=False)
 
+def MigrateConversations():
+    """Move the legacy "conversations" list out of conversation_log.json."""
+    legacy = memory_store.pop("conversations")
+    if legacy and journal.is_empty():
+        journal.extend(legacy)
+        print(f"[MEMORY] Migrated {len(legacy)} conversations to {JOURNAL_FILE}")
+    if legacy is not None:
+        memory_store.flush()
 
-def SaveConversation(user_msg, assistant_msg):
-    memory = LoadMemory()
-    memory["conversations"].append({
+
+def SaveConversation(user_msg, assistant_msg, session=None):
+    entry = {
         "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "user": user_msg,
         "assistant": assistant_msg
-    })
-    SaveMemory(memory)
+    }
+    if session is not None and session.id != DEFAULT_SESSION:
+        entry["session"] = session.id
+        entry["lang"] = session.lang
+    journal.append(entry)
+    _NoteJournalSession(entry.get("session", DEFAULT_SESSION))
+
+
+def CompactJournal():
+    """Apply journal retention now; returns the number of entries kept."""
+    return journal.compact()
+
+
+MigrateConversations()
 
 # ===============================
 # FACT EXTRACTION
 # ===============================
+FACT_PATTERNS = [
+    (r"\bi am (\w+)", "name"),
+    (r"\bmy name is (\w+)", "name"),
+    (r"\bcall me (\w+)", "name"),
+    (r"\bmy favorite language is ([a-zA-Z]+)", "favorite_language"),
+    (r"\bi study ([a-zA-Z ]+)", "field_of_study"),
+    (r"\bi live in ([a-zA-Z ]+)", "location"),
+    (r"\bmy project is ([a-zA-Z0-9 ]+)", "project"),
+]
+
+fact_extractor = FactExtractor(FACT_PATTERNS)
+
+
 def AutoExtractFacts(text):
-    memory = LoadMemory()
-    facts = memory["facts"]
-    t = text.lower()
-
-    patterns = [
-        (r"\bi am (\w+)", "name"),
-        (r"\bmy name is (\w+)", "name"),
-        (r"\bcall me (\w+)", "name"),
-        (r"\bmy favorite language is ([a-zA-Z]+)", "favorite_language"),
-        (r"\bi study ([a-zA-Z ]+)", "field_of_study"),
-        (r"\bi live in ([a-zA-Z ]+)", "location"),
-        (r"\bmy project is ([a-zA-Z0-9 ]+)", "project"),
-    ]
+    changed = False
+    with FACT_SECONDS.time():
+        facts = fact_extractor.extract(text)
+    for key, value in facts.items():
+        changed = memory_store.set_fact(key, value) or changed
+    if changed:
+        response_cache.clear()
 
-    for pattern, key in patterns:
-        match = re.search(pattern, t)
-        if match:
-            facts[key] = match.group(1).strip().title()
 
-    SaveMemory(memory)
+def RebuildFacts():
+    """Rebuild facts from every logged user message in one streaming pass."""
+    facts = fact_extractor.rebuild(conv.get("user", "") for conv in journal)
+    for key, value in facts.items():
+        memory_store.set_fact(key, value)
+    memory_store.flush()
+    response_cache.clear()
+    return facts
 
 
 def RecallFact(query):
-    memory = LoadMemory()
-    facts = memory["facts"]
+    facts = memory_store.facts
     q = query.lower()
 
     if "name" in q and "name" in facts:
         return f"Your name is {facts['name']}."
-    if "favorite" in q and "language" in facts:
+    if "favorite" in q and "favorite_language" in facts:
         return f"Your favorite language is {facts['favorite_language']}."
     if "study" in q and "field_of_study" in facts:
         return f"You study {facts['field_of_study']}."
@@ -124,12 +325,11 @@ def RecallFact(query):
 
 
 def GetMemoryContext():
-    memory = LoadMemory()
-    facts = memory["facts"]
+    facts = memory_store.facts
     if not facts:
         return ""
     context = "Known facts about the user:\n"
-    for k, v in facts.items():
+    for k, v in list(facts.items()):
         context += f"- {k.replace('_', ' ').capitalize()}: {v}\n"
     return context.strip()
 
@@ -197,109 +397,594 @@ def SaveCodeToFile(language, code):
 # ===============================
 # CHAT HISTORY
 # ===============================
-chat_history = []
+# One history per client session (token-counted, old turns fold into a
+# rolling summary). Sessions live in a bounded LRU and are rehydrated from
+# the journal when an evicted or unknown id comes back.
+REHYDRATE_TURNS = 15
+REHYDRATE_SCAN_LIMIT = 20000
+
+# Session ids with entries in the last REHYDRATE_SCAN_LIMIT journal lines,
+# i.e. the only ids a rehydration scan could find. Built by one scan on the
+# first non-default lookup, then kept current by SaveConversation; unknown
+# (e.g. random) ids are answered from it without touching the journal.
+_journal_sessions = None
+_journal_sessions_lock = threading.Lock()
+
+
+def _JournalSessions():
+    global _journal_sessions
+    with _journal_sessions_lock:
+        if _journal_sessions is None:
+            ids = set()
+            for scanned, entry in enumerate(journal.iter_reverse()):
+                if scanned >= REHYDRATE_SCAN_LIMIT:
+                    break
+                ids.add(entry.get("session", DEFAULT_SESSION))
+            _journal_sessions = ids
+        return _journal_sessions
+
+
+def _NoteJournalSession(session_id):
+    with _journal_sessions_lock:
+        if _journal_sessions is not None:
+            _journal_sessions.add(session_id)
+
+
+def _RehydrateSession(session):
+    if session.id == DEFAULT_SESSION:
+        entries = journal.tail(REHYDRATE_TURNS, match=lambda e: "session" not in e,
+                               scan_limit=REHYDRATE_SCAN_LIMIT)
+    else:
+        if session.id not in _JournalSessions():
+            return
+        entries = journal.tail(REHYDRATE_TURNS, match=lambda e: e.get("session") == session.id,
+                               scan_limit=REHYDRATE_SCAN_LIMIT)
+    for conv in entries:
+        session.history.append({"role": "user", "content": conv["user"]})
+        session.history.append({"role": "assistant", "content": conv["assistant"]})
+    if entries and entries[-1].get("lang"):
+        session.lang = entries[-1]["lang"]
+
+
+sessions = SessionStore(loader=_RehydrateSession)
+default_session = sessions.pin(DEFAULT_SESSION)
+
+# History of the local (CLI) session
+chat_history = default_session.history
+
+
+def GetSession(session_id=None):
+    return sessions.get(session_id)
+
+
+def SessionStats():
+    return sessions.stats()
+
+# History tokens each provider may receive (system prompt not included)
+HISTORY_BUDGETS = {
+    "groq": 6000,
+    "openai": 12000,
+    "gemini": 12000,
+    "cohere": 4000,
+}
+
+
+def HistoryFor(provider, history, query=None):
+    """Newest history that fits the provider's budget, minus the pending query."""
+    history = history.window(HISTORY_BUDGETS[provider])
+    if query is not None and history and history[-1] == {"role": "user", "content": query}:
+        history = history[:-1]
+    return history
+
+# ===============================
+# RESPONSE CACHE
+# ===============================
+# Answers are reused only when the query, the known facts and the last
+# CACHE_HISTORY_WINDOW messages all match. Anything time-dependent or with
+# side effects (file saves) always goes to the LLM.
+CACHE_HISTORY_WINDOW = 2
+UNCACHEABLE = re.compile(
+    r"\b(time|date|today|tonight|tomorrow|yesterday|now|current|latest|news|weather|random)\b",
+    re.IGNORECASE
+)
+
+response_cache = ResponseCache()
+
+
+def NormalizeQuery(query):
+    return re.sub(r"\s+", " ", query.lower()).strip(" ?!.")
+
+
+def ResponseCacheKey(query, history):
+    if UNCACHEABLE.search(query) or UserWantsFileSave(query):
+        return None
+    window = history[-CACHE_HISTORY_WINDOW:] if CACHE_HISTORY_WINDOW else []
+    context = json.dumps([sorted(memory_store.facts.items()), window], ensure_ascii=False)
+    digest = hashlib.sha1(context.encode("utf-8")).hexdigest()
+    return NormalizeQuery(query) + "|" + digest
+
+
+def CacheStats():
+    return response_cache.stats()
 
 # ===============================
 # LLM FUNCTIONS
 # ===============================
-def GroqChat():
-    global chat_history
-    answer = ""
-    models = [
-        "llama-3.3-70b-versatile",
-        "llama-3.1-70b-versatile",
-        "llama-3.1-8b-instant"
-    ]
+# Every provider is a generator of text chunks, so callers can either
+# stream them straight to the client or join them into one answer.
+OPENAI_MODEL = "gpt-4o-mini"
+GEMINI_MODEL = "gemini-2.5-flash"
+COHERE_MODEL = "command-r-plus"
+GROQ_MODELS = [
+    "llama-3.3-70b-versatile",
+    "llama-3.1-70b-versatile",
+    "llama-3.1-8b-instant"
+]
 
-    system_message = {
-        "role": "system",
-        "content": SYSTEM_PROMPT + "\n" + GetMemoryContext() + "\n" + RealtimeInformation()
-    }
 
-    for model in models:
+def SystemPrompt(history):
+    prompt = SYSTEM_PROMPT + "\n" + GetMemoryContext() + "\n" + RealtimeInformation()
+    summary = history.summary
+    if summary:
+        prompt += "\nSummary of earlier conversation:\n" + summary
+    return prompt
+
+
+def SystemMessage(history):
+    return {"role": "system", "content": SystemPrompt(history)}
+
+
+def GroqStream(query, history):
+    system_message = SystemMessage(history)
+
+    for model in GROQ_MODELS:
+        breaker = get_breaker(f"groq:{model}")
+        if not breaker.allow():
+            continue
+        started = False
         try:
-            stream = groq_client.chat.completions.create(
-                model=model,
-                messages=[system_message] + chat_history,
-                stream=True,
-                temperature=0.7,
-                max_tokens=1024
-            )
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    answer += chunk.choices[0].delta.content
-            return AnswerModifier(answer)
-        except:
+            with ModelAttempt("groq", model) as attempt:
+                stream = GetClient("groq").chat.completions.create(
+                    model=model,
+                    messages=[system_message] + HistoryFor("groq", history),
+                    stream=True,
+                    temperature=0.7,
+                    max_tokens=1024
+                )
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        attempt.first_token()
+                        started = True
+                        yield chunk.choices[0].delta.content
+            breaker.record_success()
+            return
+        except Exception as e:
+            print(f"[LLM] groq:{model} failed: {e}")
+            breaker.record_failure()
+            if started:
+                # Tokens already went out; the next model cannot take over
+                raise
+            PROVIDER_FALLBACKS.inc(provider=f"groq:{model}")
+        finally:
+            # Closed mid-stream (hedge lost, client gone): free a half-open trial
+            breaker.release()
+    raise RuntimeError("Groq failed")
+
+
+def OpenAIStream(query, history):
+    with ModelAttempt("openai", OPENAI_MODEL) as attempt:
+        stream = GetClient("openai").chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[SystemMessage(history)] + HistoryFor("openai", history),
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                attempt.first_token()
+                yield chunk.choices[0].delta.content
+
+
+def GeminiStream(query, history):
+    prompt = SystemPrompt(history) + "\n"
+    for msg in HistoryFor("gemini", history, query):
+        prompt += f"{msg['role']}: {msg['content']}\n"
+    prompt += f"user: {query}\nassistant:"
+
+    with ModelAttempt("gemini", GEMINI_MODEL) as attempt:
+        for chunk in GetClient("gemini").models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=prompt
+        ):
+            if chunk.text:
+                attempt.first_token()
+                yield chunk.text
+
+
+def CohereStream(query, history):
+    cohere_history = [
+        {"role": "USER" if msg["role"] == "user" else "CHATBOT", "message": msg["content"]}
+        for msg in HistoryFor("cohere", history, query)
+    ]
+    with ModelAttempt("cohere", COHERE_MODEL) as attempt:
+        res = GetClient("cohere").chat(
+            model=COHERE_MODEL,
+            message=query,
+            preamble=SystemPrompt(history),
+            chat_history=cohere_history
+        )
+        attempt.first_token()
+    yield res.text
+
+
+def GroqChat(history=None):
+    return AnswerModifier("".join(GroqStream(None, _Default(history))))
+
+
+def OpenAIChat(history=None):
+    return AnswerModifier("".join(OpenAIStream(None, _Default(history))))
+
+
+def GeminiChat(query, history=None):
+    return AnswerModifier("".join(GeminiStream(query, _Default(history))))
+
+
+def CohereChat(query, history=None):
+    return "".join(CohereStream(query, _Default(history)))
+
+
+def _Default(history):
+    return chat_history if history is None else history
+
+# ===============================
+# PROVIDER CHAIN
+# ===============================
+# (name, stream(query, history)) in order of preference
+PROVIDERS = [
+    ("groq", GroqStream),
+    ("openai", OpenAIStream),
+    ("gemini", GeminiStream),
+    ("cohere", CohereStream),
+]
+
+
+def _RunProvider(attempt, name, stream_fn, query, history, events, cancelled):
+    """Pump one provider's chunks into `events` until done or cancelled."""
+    breaker = get_breaker(name)
+    stream = None
+    try:
+        stream = stream_fn(query, history)
+        got_text = False
+        for chunk in stream:
+            if cancelled.is_set():
+                return
+            got_text = got_text or bool(chunk.strip())
+            events.put((attempt, "token", chunk))
+        if not got_text:
+            raise RuntimeError("empty answer")
+        breaker.record_success()
+        events.put((attempt, "done", None))
+    except Exception as e:
+        print(f"[LLM] {name} failed: {e}")
+        breaker.record_failure()
+        events.put((attempt, "error", e))
+    finally:
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+        # Cancelled attempts record nothing: free a half-open trial
+        breaker.release()
+
+
+def StreamProviders(query, history):
+    """
+    Yield answer chunks from the first provider that answers.
+
+    Providers whose circuit breaker is open are skipped. A provider that
+    fails before its first token hands over to the next one. With
+    HEDGE_DELAY > 0, a provider that has not produced a first token by the
+    deadline is raced against the next one; whichever streams first wins
+    and the others are cancelled.
+    """
+    # available() has no side effects; the half-open trial is only claimed
+    # by allow() in launch(), right before the provider is actually called
+    chain = [(name, fn) for name, fn in PROVIDERS if get_breaker(name).available()]
+    forced = not chain
+    if forced:
+        # Everything is tripped: try the full chain rather than fail outright
+        chain = list(PROVIDERS)
+
+    events = queue.Queue()
+    cancel_flags = []
+    names = []
+    errors = []
+    live = set()
+    winner = None
+    next_up = 0   # index in `chain` of the next provider to launch
+
+    def launch():
+        nonlocal next_up
+        while next_up < len(chain):
+            name, fn = chain[next_up]
+            next_up += 1
+            if not forced and not get_breaker(name).allow():
+                continue   # tripped (or trial taken) since the chain was built
+            attempt = len(cancel_flags)
+            cancelled = threading.Event()
+            cancel_flags.append(cancelled)
+            names.append(name)
+            live.add(attempt)
+            threading.Thread(
+                target=_RunProvider,
+                args=(attempt, name, fn, query, history, events, cancelled),
+                daemon=True
+            ).start()
+            return
+
+    launch()
+    try:
+        while live:
+            timeout = None
+            if winner is None and HEDGE_DELAY > 0 and next_up < len(chain):
+                timeout = HEDGE_DELAY
+            try:
+                attempt, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                print(f"[LLM] No first token after {HEDGE_DELAY}s, hedging to {chain[next_up][0]}")
+                PROVIDER_HEDGES.inc(provider=chain[next_up][0])
+                launch()
+                continue
+
+            if winner is not None and attempt != winner:
+                continue
+
+            if kind == "token":
+                if winner is None:
+                    winner = attempt
+                    for other in live - {attempt}:
+                        cancel_flags[other].set()
+                    live.intersection_update({attempt})
+                yield value
+            elif kind == "done":
+                return
+            else:
+                live.discard(attempt)
+                errors.append(f"{names[attempt]}: {value}")
+                if winner is not None:
+                    raise RuntimeError(f"{names[attempt]} failed mid-answer: {value}")
+                PROVIDER_FALLBACKS.inc(provider=names[attempt])
+                launch()
+    finally:
+        for flag in cancel_flags:
+            flag.set()
+
+    raise RuntimeError("All LLM providers failed (" + "; ".join(errors) + ")")
+
+# ===============================
+# ASYNC LLM FUNCTIONS
+# ===============================
+# Same providers on the async SDK clients, sharing one pooled keep-alive
+# connection pool; used by the FastAPI endpoints so a slow vendor holds an
+# event-loop task instead of a worker thread.
+llm_slots = asyncio.Semaphore(MAX_CONCURRENT_LLM)
+
+
+async def GroqStreamAsync(query, history):
+    system_message = SystemMessage(history)
+
+    for model in GROQ_MODELS:
+        breaker = get_breaker(f"groq:{model}")
+        if not breaker.allow():
             continue
+        started = False
+        try:
+            with ModelAttempt("groq", model) as attempt:
+                stream = await GetClient("async_groq").chat.completions.create(
+                    model=model,
+                    messages=[system_message] + HistoryFor("groq", history),
+                    stream=True,
+                    temperature=0.7,
+                    max_tokens=1024
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        attempt.first_token()
+                        started = True
+                        yield chunk.choices[0].delta.content
+            breaker.record_success()
+            return
+        except Exception as e:
+            print(f"[LLM] groq:{model} failed: {e}")
+            breaker.record_failure()
+            if started:
+                raise
+            PROVIDER_FALLBACKS.inc(provider=f"groq:{model}")
+        finally:
+            breaker.release()
     raise RuntimeError("Groq failed")
 
 
-def OpenAIChat():
-    system_message = {
-        "role": "system",
-        "content": SYSTEM_PROMPT + "\n" + GetMemoryContext() + "\n" + RealtimeInformation()
-    }
-    res = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[system_message] + chat_history
-    )
-    return AnswerModifier(res.choices[0].message.content)
+async def OpenAIStreamAsync(query, history):
+    with ModelAttempt("openai", OPENAI_MODEL) as attempt:
+        stream = await GetClient("async_openai").chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[SystemMessage(history)] + HistoryFor("openai", history),
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                attempt.first_token()
+                yield chunk.choices[0].delta.content
 
 
-def GeminiChat(query):
-    prompt = SYSTEM_PROMPT + "\n" + GetMemoryContext() + "\n" + RealtimeInformation()
-    for msg in chat_history[-10:]:
+async def GeminiStreamAsync(query, history):
+    prompt = SystemPrompt(history) + "\n"
+    for msg in HistoryFor("gemini", history, query):
         prompt += f"{msg['role']}: {msg['content']}\n"
     prompt += f"user: {query}\nassistant:"
 
-    res = gemini_client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-    return AnswerModifier(res.text)
+    with ModelAttempt("gemini", GEMINI_MODEL) as attempt:
+        stream = await GetClient("gemini").aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=prompt
+        )
+        async for chunk in stream:
+            if chunk.text:
+                attempt.first_token()
+                yield chunk.text
+
+
+async def CohereStreamAsync(query, history):
+    cohere_history = [
+        {"role": "USER" if msg["role"] == "user" else "CHATBOT", "message": msg["content"]}
+        for msg in HistoryFor("cohere", history, query)
+    ]
+    with ModelAttempt("cohere", COHERE_MODEL) as attempt:
+        res = await GetClient("async_cohere").chat(
+            model=COHERE_MODEL,
+            message=query,
+            preamble=SystemPrompt(history),
+            chat_history=cohere_history
+        )
+        attempt.first_token()
+    yield res.text
+
+
+ASYNC_PROVIDERS = [
+    ("groq", GroqStreamAsync),
+    ("openai", OpenAIStreamAsync),
+    ("gemini", GeminiStreamAsync),
+    ("cohere", CohereStreamAsync),
+]
+
+
+async def _RunProviderAsync(attempt, name, stream_fn, query, history, events):
+    breaker = get_breaker(name)
+    try:
+        async with llm_slots:
+            got_text = False
+            async for chunk in stream_fn(query, history):
+                got_text = got_text or bool(chunk.strip())
+                await events.put((attempt, "token", chunk))
+        if not got_text:
+            raise RuntimeError("empty answer")
+        breaker.record_success()
+        await events.put((attempt, "done", None))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[LLM] {name} failed: {e}")
+        breaker.record_failure()
+        await events.put((attempt, "error", e))
+    finally:
+        breaker.release()
+
+
+async def StreamProvidersAsync(query, history):
+    """Async twin of StreamProviders (breakers, fallback, hedging); losers are cancelled."""
+    chain = [(name, fn) for name, fn in ASYNC_PROVIDERS if get_breaker(name).available()]
+    forced = not chain
+    if forced:
+        chain = list(ASYNC_PROVIDERS)
+
+    events = asyncio.Queue()
+    tasks = []
+    names = []
+    errors = []
+    live = set()
+    winner = None
+    next_up = 0
+
+    def launch():
+        nonlocal next_up
+        while next_up < len(chain):
+            name, fn = chain[next_up]
+            next_up += 1
+            if not forced and not get_breaker(name).allow():
+                continue
+            attempt = len(tasks)
+            names.append(name)
+            live.add(attempt)
+            tasks.append(asyncio.create_task(_RunProviderAsync(attempt, name, fn, query, history, events)))
+            return
+
+    launch()
+    try:
+        while live:
+            timeout = None
+            if winner is None and HEDGE_DELAY > 0 and next_up < len(chain):
+                timeout = HEDGE_DELAY
+            try:
+                attempt, kind, value = await asyncio.wait_for(events.get(), timeout)
+            except asyncio.TimeoutError:
+                print(f"[LLM] No first token after {HEDGE_DELAY}s, hedging to {chain[next_up][0]}")
+                PROVIDER_HEDGES.inc(provider=chain[next_up][0])
+                launch()
+                continue
 
+            if winner is not None and attempt != winner:
+                continue
+
+            if kind == "token":
+                if winner is None:
+                    winner = attempt
+                    for other in live - {attempt}:
+                        tasks[other].cancel()
+                    live.intersection_update({attempt})
+                yield value
+            elif kind == "done":
+                return
+            else:
+                live.discard(attempt)
+                errors.append(f"{names[attempt]}: {value}")
+                if winner is not None:
+                    raise RuntimeError(f"{names[attempt]} failed mid-answer: {value}")
+                PROVIDER_FALLBACKS.inc(provider=names[attempt])
+                launch()
+    finally:
+        for task in tasks:
+            task.cancel()
 
-def CohereChat(query):
-    return cohere_client.chat(
-        model="command-r-plus",
-        message=query
-    ).text
+    raise RuntimeError("All LLM providers failed (" + "; ".join(errors) + ")")
 
 # ===============================
 # MAIN CHATBOT
 # ===============================
-def ChatBot(query):
-    global chat_history
-    q = query.strip()
-    if not q:
-        return "Please type something."
+def _RecordTurn(q, reply, session):
+    session.history.extend([
+        {"role": "user", "content": q},
+        {"role": "assistant", "content": reply}
+    ])
+    SaveConversation(q, reply, session)
+
 
+def _BeginTurn(q, session):
+    """
+    Everything before the LLM call. Returns (reply, cache_key): `reply` is
+    set when the turn was answered locally (fact recall or cache hit).
+    """
     AutoExtractFacts(q)
 
     recall = RecallFact(q)
     if recall:
-        chat_history.extend([
-            {"role": "user", "content": q},
-            {"role": "assistant", "content": recall}
-        ])
-        SaveConversation(q, recall)
-        return recall
+        _RecordTurn(q, recall, session)
+        return recall, None
 
-    chat_history.append({"role": "user", "content": q})
+    cache_key = ResponseCacheKey(q, session.history)
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        _RecordTurn(q, cached, session)
+        return cached, None
 
-    try:
-        ans = GroqChat()
-    except:
-        try:
-            ans = OpenAIChat()
-        except:
-            try:
-                ans = GeminiChat(q)
-            except:
-                ans = CohereChat(q)
+    session.history.append({"role": "user", "content": q})
+    return None, cache_key
 
-    ans = AnswerModifier(ans)
 
+def _FinishTurn(q, raw_answer, cache_key, session):
+    """Everything after the LLM call. Returns (final answer, extra text to stream)."""
+    ans = AnswerModifier(raw_answer)
+    if cache_key:
+        response_cache.put(cache_key, ans)
+
+    note = ""
     # -------- FILE SAVE HOOK --------
     if UserWantsFileSave(q):
         blocks = ExtractCodeBlocks(ans)
@@ -307,26 +992,96 @@ def ChatBot(query):
             paths = []
             for lang, code in blocks:
                 paths.append(SaveCodeToFile(lang, code))
-            ans += "\n\n📁 Saved files:\n" + "\n".join(paths)
+            note = "\n\n📁 Saved files:\n" + "\n".join(paths)
         else:
-            ans += "\n\n⚠️ No code block found to save."
+            note = "\n\n⚠️ No code block found to save."
+        ans += note
     # --------------------------------
 
-    chat_history.append({"role": "assistant", "content": ans})
-    AutoExtractFacts(ans)
-    SaveConversation(q, ans)
+    session.history.append({"role": "assistant", "content": ans})
+    SaveConversation(q, ans, session)
+    return ans, note
+
+
+def ChatBotStream(query, session=None):
+    """
+    Yield the reply chunk by chunk as the provider produces it.
+
+    Post-processing (file-save hook, history, journal) runs once the
+    stream finishes; the final cleaned answer is the generator's return
+    value (see ChatBot). Without a session the local CLI session is used.
+    """
+    session = session or GetSession()
+    q = query.strip()
+    if not q:
+        yield "Please type something."
+        return "Please type something."
+
+    reply, cache_key = _BeginTurn(q, session)
+    if reply is not None:
+        yield reply
+        return reply
+
+    parts = []
+    for chunk in StreamProviders(q, session.history):
+        parts.append(chunk)
+        yield chunk
+
+    ans, note = _FinishTurn(q, "".join(parts), cache_key, session)
+    if note:
+        yield note
     return ans
 
+
+def ChatBot(query, session=None):
+    stream = ChatBotStream(query, session)
+    while True:
+        try:
+            next(stream)
+        except StopIteration as done:
+            return done.value
+
+
+async def ChatBotStreamAsync(query, result=None, session=None):
+    """
+    Async twin of ChatBotStream for the web server. Async generators
+    cannot return a value, so the final answer goes to result["reply"].
+    """
+    session = session or GetSession()
+    if result is None:
+        result = {}
+    q = query.strip()
+    if not q:
+        result["reply"] = "Please type something."
+        yield result["reply"]
+        return
+
+    reply, cache_key = _BeginTurn(q, session)
+    if reply is not None:
+        result["reply"] = reply
+        yield reply
+        return
+
+    parts = []
+    async for chunk in StreamProvidersAsync(q, session.history):
+        parts.append(chunk)
+        yield chunk
+
+    ans, note = _FinishTurn(q, "".join(parts), cache_key, session)
+    result["reply"] = ans
+    if note:
+        yield note
+
 # ===============================
 # CLI LOOP
 # ===============================
 if __name__ == "__main__":
-    print(f"\n🤖 {Assistantname} ready, {Username}!\n")
+    if "--rebuild-facts" in sys.argv:
+        print(f"Rebuilt facts: {RebuildFacts()}")
+        sys.exit()
 
-    memory = LoadMemory()
-    for conv in memory["conversations"][-15:]:
-        chat_history.append({"role": "user", "content": conv["user"]})
-        chat_history.append({"role": "assistant", "content": conv["assistant"]})
+    # The local session already holds the last turns from the journal
+    print(f"\n🤖 {Assistantname} ready, {Username}!\n")
 
     while True:
         q = input(f"{Username} > ")
@@ -0,0 +1,175 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from dotenv import dotenv_values
+import metrics
+
+env = dotenv_values(".env")
+
+# ===============================
+# CONFIG
+# ===============================
+MAX_ACTIVE = int(env.get("MaxActiveChats", "16") or 16)              # chats served at once
+MAX_QUEUED = int(env.get("MaxQueuedChats", "64") or 64)              # waiting, all clients
+MAX_QUEUED_PER_CLIENT = int(env.get("MaxQueuedPerClient", "4") or 4)
+QUEUE_TIMEOUT = float(env.get("QueueTimeout", "10") or 10)           # seconds a request may wait
+
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "tron_admission_wait_seconds", "Time a chat request waited for a slot")
+ADMISSION_REJECTED = metrics.counter(
+    "tron_admission_rejected_total", "Chat requests turned away", ("reason",))
+ADMISSION_ACTIVE = metrics.gauge(
+    "tron_admission_active", "Chat requests being served")
+ADMISSION_QUEUED = metrics.gauge(
+    "tron_admission_queued", "Chat requests waiting for a slot")
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control; maps to an HTTP status + Retry-After."""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ===============================
+# TICKET
+# ===============================
+class Ticket:
+    """A granted slot. release() is idempotent, so every exit path may call it."""
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+
+# ===============================
+# ADMISSION CONTROLLER
+# ===============================
+class AdmissionController:
+    """
+    Bounded, fair admission for chat requests (single event loop).
+
+    At most `max_active` requests are served at once. The rest wait in one
+    FIFO per client, and freed slots go to the clients round-robin, so one
+    chatty client cannot starve the others. Requests are rejected fast
+    instead of piling up:
+    - 429 when the client already has `max_per_client` requests waiting;
+    - 503 when `max_queued` requests are waiting overall, or a request has
+      waited `queue_timeout` seconds.
+    Retry-After is estimated from the recent service time and queue length.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE, max_queued=MAX_QUEUED,
+                 max_per_client=MAX_QUEUED_PER_CLIENT, queue_timeout=QUEUE_TIMEOUT):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self._waiters = OrderedDict()   # client -> deque of futures, in rotation order
+        self._service_time = 1.0        # moving average of seconds per request
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self, client):
+        """Wait for a slot and return its Ticket, or raise Overloaded."""
+        if self.active < self.max_active and not self.queued:
+            self.active += 1
+            return self._grant(0.0)
+
+        waiters = self._waiters.get(client)
+        if waiters is not None and len(waiters) >= self.max_per_client:
+            raise self._reject(429, "client_queue_full", "Too many requests queued for this client")
+        if self.queued >= self.max_queued:
+            raise self._reject(503, "queue_full", "Server busy, request queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        if waiters is None:
+            waiters = self._waiters[client] = deque()
+        waiters.append(future)
+        self.queued += 1
+        ADMISSION_QUEUED.set(self.queued)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self._release(None)
+            else:
+                future.cancel()
+                self._forget(client, future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(503, "queue_timeout", "Server busy, timed out waiting in queue")
+        return self._grant(time.monotonic() - started)
+
+    def _grant(self, waited):
+        # Queued requests inherit the slot of the request that released it,
+        # so only the fast path in acquire() increments `active`
+        self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(waited)
+        ADMISSION_ACTIVE.set(self.active)
+        return Ticket(self)
+
+    def _release(self, service_time):
+        if service_time is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+        # Hand the slot to the next client in rotation
+        while self._waiters:
+            client, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(client)
+            else:
+                del self._waiters[client]
+            self.queued -= 1
+            ADMISSION_QUEUED.set(self.queued)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+        ADMISSION_ACTIVE.set(self.active)
+
+    def _forget(self, client, future):
+        waiters = self._waiters.get(client)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self.queued -= 1
+            ADMISSION_QUEUED.set(self.queued)
+            if not waiters:
+                del self._waiters[client]
+
+    def _reject(self, status, reason, message):
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+        return Overloaded(status, message, self.retry_after())
+
+    def retry_after(self):
+        """Seconds until the current queue has likely drained (at least 1)."""
+        backlog = (self.queued + 1) / max(self.max_active, 1)
+        return max(1, math.ceil(backlog * self._service_time))
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "clients_waiting": len(self._waiters),
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_seconds": round(self._service_time, 3),
+        }
@@ -0,0 +1,66 @@
+import io
+import wave
+
+import pygame
+
+BLOCK_SECONDS = 0.05   # PCM handed to the device per write (also how fast a stop is honored)
+
+_sounddevice = None    # imported on first WAV; False when unavailable
+
+
+def _device():
+    global _sounddevice
+    if _sounddevice is None:
+        try:
+            import sounddevice  # optional: needs PortAudio
+            _sounddevice = sounddevice
+        except Exception:
+            _sounddevice = False
+    return _sounddevice
+
+
+def play(audio: bytes, stop, poll: float = 0.02) -> bool:
+    """
+    Play a clip from memory, blocking until it ends. `stop` is a
+    threading.Event checked while playing; returns False if it cut the
+    clip off. WAV goes to the device as raw PCM, MP3 through the mixer.
+    """
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    if audio[:4] == b"RIFF":
+        return _play_wav(audio, stop, poll)
+    return _play_mp3(audio, stop, poll)
+
+
+def _play_mp3(audio: bytes, stop, poll: float) -> bool:
+    pygame.mixer.music.load(io.BytesIO(audio), "mp3")
+    pygame.mixer.music.play()
+    while pygame.mixer.music.get_busy():
+        if stop.wait(poll):
+            pygame.mixer.music.stop()
+            return False
+    return True
+
+
+def _play_wav(audio: bytes, stop, poll: float) -> bool:
+    sd = _device()
+    if sd:
+        with wave.open(io.BytesIO(audio)) as wav:
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            pcm = wav.readframes(wav.getnframes())
+        block = int(rate * BLOCK_SECONDS) * channels * 2
+        with sd.RawOutputStream(samplerate=rate, channels=channels, dtype="int16") as out:
+            for start in range(0, len(pcm), block):
+                if stop.is_set():
+                    out.abort()
+                    return False
+                out.write(pcm[start:start + block])
+        return True
+
+    # No sounddevice: pygame converts the WAV to the mixer's format
+    channel = pygame.mixer.Sound(file=io.BytesIO(audio)).play()
+    while channel is not None and channel.get_busy():
+        if stop.wait(poll):
+            channel.stop()
+            return False
+    return True
@@ -0,0 +1,12 @@
+"""
+Offline benchmarks for the TRON backend (no network, no API keys).
+
+Run from the Backend directory:
+
+    python -m benchmarks              # microbenchmarks + a default load test
+    python -m benchmarks.micro        # AutoExtractFacts, memory, journal, log_message
+    python -m benchmarks.load_test --requests 2000 --concurrency 64 --failure-rate 0.1
+
+Everything runs inside a temporary data directory (see stubs.sandbox()),
+with the LLM providers and speech output replaced by local stubs.
+"""
@@ -0,0 +1,8 @@
+from benchmarks import micro, load_test
+from benchmarks.stubs import sandbox
+
+# Quick pass over everything; run the modules directly for more options.
+# One sandbox: the backend binds its data paths when first imported
+directory = sandbox()
+micro.main(["--sizes", "1000,10000", "--min-time", "0.3"], directory)
+load_test.main(["--requests", "500", "--concurrency", "32"], directory)
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import itertools
+import time
+
+from benchmarks.stubs import sandbox, make_providers, install_providers, SilentTTS
+from benchmarks.report import summarize, print_table
+
+
+def load_app(providers):
+    """Import the FastAPI app inside the sandbox with stub providers and silent TTS."""
+    import Tron_Chatbot
+    install_providers(Tron_Chatbot, providers)
+    # Swapped in before main builds its TextToSpeech: the real one would
+    # load Piper and prewarm stock phrases through gTTS over the network
+    import text_to_speech
+    text_to_speech.TextToSpeech = SilentTTS
+    import main
+    return main.app
+
+
+class FirstByteProbe:
+    """
+    ASGI wrapper noting when each request sends its first body bytes.
+    httpx's ASGITransport only hands the client a response once it is
+    complete, so timing the client side would just repeat end to end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.first_byte = {}   # x-bench-id header -> perf_counter()
+
+    async def __call__(self, scope, receive, send):
+        request_id = dict(scope.get("headers", ())).get(b"x-bench-id")
+        if request_id is None:
+            return await self.app(scope, receive, send)
+
+        async def probe(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                self.first_byte.setdefault(request_id.decode(), time.perf_counter())
+            await send(message)
+
+        await self.app(scope, receive, probe)
+
+
+async def run_load(app, endpoint, requests, concurrency, sessions, repeat_every):
+    """
+    Fire `requests` chat messages with `concurrency` in flight. Returns
+    (latencies, first-byte latencies, errors, elapsed seconds).
+    Every `repeat_every`-th message is the same question asked as the first
+    turn of a fresh session, so it can hit the response cache (whose key
+    includes the session's recent turns); 0 = all unique.
+    """
+    import httpx
+
+    counter = itertools.count()
+    latencies, first_tokens, errors = [], [], []
+    probe = FirstByteProbe(app)
+
+    def request(i):
+        if repeat_every and i % repeat_every == 0:
+            return {"message": "how does a hash map handle collisions", "session_id": f"bench-repeat-{i}"}
+        return {"message": f"question {i}: how would you design system number {i % 97}",
+                "session_id": f"bench-{i % sessions}"}
+
+    async def worker(client):
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            start = time.perf_counter()
+            try:
+                res = await client.post(endpoint, json=request(i), headers={"x-bench-id": str(i)})
+                res.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                if endpoint == "/tron/stream":
+                    first_tokens.append(probe.first_byte.pop(str(i), time.perf_counter()) - start)
+            except Exception as e:
+                errors.append(repr(e))
+
+    transport = httpx.ASGITransport(app=probe)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, first_tokens, errors, elapsed
+
+
+def main(argv=None, directory=None):
+    parser = argparse.ArgumentParser(description="In-process /tron load test with stub LLM providers")
+    parser.add_argument("--endpoint", default="/tron", choices=["/tron", "/tron/stream"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=16, help="distinct session ids")
+    parser.add_argument("--providers", type=int, default=2, help="stub providers in the chain")
+    parser.add_argument("--first-token", type=float, default=0.05, help="seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.002, help="seconds between chunks")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per answer")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="probability the first provider fails (falls back to the next)")
+    parser.add_argument("--repeat-every", type=int, default=10,
+                        help="every Nth message is a repeat (cache hit); 0 = all unique")
+    args = parser.parse_args(argv)
+
+    directory = directory or sandbox()
+    providers = make_providers(args.providers, args.first_token, args.chunk_delay,
+                               args.chunks, args.failure_rate)
+    app = load_app(providers)
+    print(f"[BENCH] data directory: {directory}")
+
+    latencies, first_tokens, errors, elapsed = asyncio.run(run_load(
+        app, args.endpoint, args.requests, args.concurrency, args.sessions, args.repeat_every
+    ))
+
+    rows = [(f"{args.endpoint} end to end", summarize(latencies))]
+    if first_tokens:
+        rows.append((f"{args.endpoint} first byte", summarize(first_tokens)))
+    print_table(
+        f"Load test: {args.requests} requests, concurrency {args.concurrency}, "
+        f"first token {args.first_token * 1000:.0f} ms, failure rate {args.failure_rate:.0%}",
+        rows
+    )
+    print(f"throughput: {len(latencies) / elapsed:,.1f} req/s over {elapsed:.2f}s, errors: {len(errors)}")
+    import Tron_Chatbot
+    cache = Tron_Chatbot.CacheStats()
+    print(f"response cache: {cache['hits']} hits, {cache['misses']} misses")
+    for p in providers:
+        print(f"  {p.name}: {p.calls} calls, {p.failures} injected failures")
+    if errors:
+        print(f"  first error: {errors[0]}")
+    return len(errors) == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import os
+import re
+
+from benchmarks.stubs import sandbox
+from benchmarks.report import measure, summarize, print_table
+
+FACT_TEXTS = {
+    "no facts (typical chat)": "can you explain how binary search works on a sorted array",
+    "one fact": "hey, my name is Surya and I need help with my homework",
+    "all facts": ("i am Surya, my favorite language is python, i study computer science, "
+                  "i live in Hyderabad and my project is Tron"),
+    "long message (4 KB)": ("tell me more about distributed systems and consensus " * 80),
+}
+
+
+def bench_facts(T, min_time):
+    rows = []
+    for label, text in FACT_TEXTS.items():
+        rows.append((label, summarize(measure(lambda: T.AutoExtractFacts(text), min_time))))
+    print_table("AutoExtractFacts", rows)
+
+
+def _search_each(patterns, text):
+    """The original extraction: one re.search per pattern over the lowercased text."""
+    lowered = text.lower()
+    facts = {}
+    for pattern, key in patterns:
+        match = re.search(pattern, lowered)
+        if match:
+            facts[key] = match.group(1).strip().title()
+    return facts
+
+
+def bench_fact_matcher(T, min_time):
+    """FactExtractor against the per-pattern loop it replaced; flags inputs where it is slower."""
+    rows, slower = [], []
+    for label, text in FACT_TEXTS.items():
+        matcher = summarize(measure(lambda: T.fact_extractor.extract(text), min_time))
+        search = summarize(measure(lambda: _search_each(T.FACT_PATTERNS, text), min_time))
+        rows += [(f"{label}: extractor", matcher), (f"{label}: re.search each", search)]
+        if matcher["p50_ms"] > search["p50_ms"]:
+            slower.append(label)
+    print_table("Fact matching vs one re.search per pattern", rows)
+    if slower:
+        print(f"  FactExtractor is SLOWER on: {', '.join(slower)}")
+    else:
+        print("  FactExtractor is faster on every input")
+    return not slower
+
+
+def bench_memory(T, sizes, min_time):
+    from memory_store import MemoryStore
+    from session_store import Session
+
+    rows = [("LoadMemory (warm)", summarize(measure(T.LoadMemory, min_time)))]
+
+    def save():
+        T.memory_store.set_fact("counter", str(os.urandom(4).hex()))
+        T.SaveMemory()
+        T.memory_store.flush()
+    rows.append(("SaveMemory + flush", summarize(measure(save, min_time))))
+
+    def cold_load():
+        MemoryStore(T.MEMORY_FILE, flush_interval=0).data
+    rows.append(("LoadMemory (cold, from disk)", summarize(measure(cold_load, min_time))))
+    print_table("Memory store", rows)
+
+    rows = []
+    entry_user = "what is the difference between a process and a thread"
+    entry_reply = "A process has its own address space; threads share one. " * 4
+    written = 0
+    for size in sizes:
+        # Grow the journal to `size` turns, then time the hot-path operations
+        T.journal.extend(
+            {"time": "2026-01-01 00:00:00", "user": f"{entry_user} {i}", "assistant": entry_reply}
+            for i in range(size - written)
+        )
+        written = size
+        saves = measure(lambda: T.SaveConversation(entry_user, entry_reply), min_time)
+        written += len(saves)
+        rows.append((f"SaveConversation @ {size:,}", summarize(saves)))
+        rows.append((f"journal tail({T.REHYDRATE_TURNS}) @ {size:,}",
+                     summarize(measure(lambda: T.journal.tail(T.REHYDRATE_TURNS), min_time))))
+        session = Session("bench-rehydrate")
+        rows.append((f"session rehydrate (miss) @ {size:,}",
+                     summarize(measure(lambda: T._RehydrateSession(session), min_time, max_calls=50))))
+    print_table("Conversation journal by history size", rows)
+
+
+def bench_log_message(min_time):
+    import conversation_db
+
+    enqueue = measure(lambda: conversation_db.log_message("user", "benchmark message"), min_time)
+    conversation_db.flush()
+
+    def burst():
+        for _ in range(1000):
+            conversation_db.log_message("tron", "benchmark reply")
+        conversation_db.flush()
+    print_table("conversation_db.log_message", [
+        ("log_message (enqueue)", summarize(enqueue)),
+        ("1000 x log_message + flush", summarize(measure(burst, min_time, max_calls=50))),
+    ])
+
+
+def main(argv=None, directory=None):
+    parser = argparse.ArgumentParser(description="TRON backend microbenchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="journal sizes (turns) for the history benchmarks")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    args = parser.parse_args(argv)
+
+    directory = directory or sandbox()
+    import Tron_Chatbot as T
+    print(f"[BENCH] data directory: {directory}")
+
+    bench_facts(T, args.min_time)
+    bench_fact_matcher(T, args.min_time)
+    bench_memory(T, [int(s) for s in args.sizes.split(",") if s], args.min_time)
+    bench_log_message(args.min_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import time
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples):
+    """count / mean / p50 / p95 / p99 / max of samples in seconds (reported in ms)."""
+    values = sorted(samples)
+    count = len(values)
+    return {
+        "count": count,
+        "mean_ms": (sum(values) / count * 1000) if count else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if count else 0.0,
+    }
+
+
+def measure(fn, min_time=0.5, max_calls=100000):
+    """Call fn() repeatedly for about `min_time` seconds; returns per-call seconds."""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_calls:
+        start = time.perf_counter()
+        fn()
+        end = time.perf_counter()
+        samples.append(end - start)
+        if end >= deadline:
+            break
+    return samples
+
+
+def print_table(title, rows):
+    """rows: (label, summarize() dict) pairs."""
+    print(f"\n{title}")
+    print("-" * 96)
+    print(f"{'case':40} {'calls':>8} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for label, s in rows:
+        print(f"{label:40} {s['count']:>8} {_ms(s['mean_ms'])} {_ms(s['p50_ms'])} "
+              f"{_ms(s['p95_ms'])} {_ms(s['p99_ms'])} {_ms(s['max_ms'])}")
+
+
+def _ms(value):
+    if value < 1:
+        return f"{value * 1000:>7.1f}us"
+    return f"{value:>7.2f}ms"
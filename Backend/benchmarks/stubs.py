@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ===============================
+# SANDBOX
+# ===============================
+def sandbox():
+    """
+    Point every store at a fresh temp directory before the backend is
+    imported: TRON_DATA_DIR for memory/journal, and the working directory
+    for the sqlite database and .env lookup (so no keys are loaded).
+    Returns the directory.
+    """
+    directory = tempfile.mkdtemp(prefix="tron_bench_")
+    os.environ["TRON_DATA_DIR"] = directory
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(directory)
+    return directory
+
+
+# ===============================
+# STUB LLM PROVIDER
+# ===============================
+class StubProvider:
+    """
+    Fake LLM provider with the same shape as the real stream functions.
+
+    Waits `first_token` seconds, then streams `chunks` words `chunk_delay`
+    seconds apart. With probability `failure_rate` it raises before the
+    first token (so the provider chain falls back to the next one).
+    """
+
+    def __init__(self, name, first_token=0.05, chunk_delay=0.002, chunks=20,
+                 failure_rate=0.0, seed=None):
+        self.name = name
+        self.first_token = first_token
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    def _should_fail(self):
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+    def _words(self, query):
+        seed = (query or "").split()[:3] or ["ok"]
+        return [f"{seed[i % len(seed)]}{i} " for i in range(self.chunks)]
+
+    def stream(self, query, history):
+        time.sleep(self.first_token)
+        if self._should_fail():
+            raise RuntimeError(f"{self.name}: injected failure")
+        for i, word in enumerate(self._words(query)):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield word
+
+    async def astream(self, query, history):
+        await asyncio.sleep(self.first_token)
+        if self._should_fail():
+            raise RuntimeError(f"{self.name}: injected failure")
+        for i, word in enumerate(self._words(query)):
+            if i and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield word
+
+
+def install_providers(chatbot, providers):
+    """Replace the sync and async provider chains of Tron_Chatbot."""
+    chatbot.PROVIDERS = [(p.name, p.stream) for p in providers]
+    chatbot.ASYNC_PROVIDERS = [(p.name, p.astream) for p in providers]
+
+
+def make_providers(count=2, first_token=0.05, chunk_delay=0.002, chunks=20,
+                   failure_rate=0.0, seed=1):
+    """`count` stubs; only the first one fails, the rest are the fallback."""
+    return [
+        StubProvider(f"stub{i + 1}", first_token, chunk_delay, chunks,
+                     failure_rate if i == 0 else 0.0, seed=seed + i)
+        for i in range(count)
+    ]
+
+
+# ===============================
+# SILENT SPEECH
+# ===============================
+class SilentTTS:
+    """Drop-in for TextToSpeech that records what would be spoken."""
+
+    def __init__(self):
+        self.spoken = 0
+        self.listeners = []
+
+    def speak(self, text, lang=None, priority=0):
+        if not text or not text.strip():
+            return None
+        self.spoken += 1
+        return f"bench{self.spoken}"
+
+    def clip_for(self, text, lang=None):
+        return None
+
+    def audio(self, key, timeout=30):
+        return None
+
+    def prepare(self, lang):
+        pass
+
+    def set_language(self, lang):
+        pass
+
+    def stats(self):
+        return {"spoken": self.spoken}
@@ -0,0 +1,116 @@
+import time
+import threading
+
+# ===============================
+# CONFIG
+# ===============================
+FAILURE_THRESHOLD = 3   # consecutive failures before the breaker opens
+COOLDOWN = 30.0         # seconds a tripped backend is skipped
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# ===============================
+# CIRCUIT BREAKER
+# ===============================
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of one backend (provider or model).
+
+    closed    -> calls go through
+    open      -> calls are skipped until the cooldown expires
+    half_open -> one trial call is let through; success closes the
+                 breaker, failure re-opens it for another cooldown
+
+    Every allow() that returns True must end in record_success(),
+    record_failure() or release().
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Whether allow() could let a call through now (does not claim the trial)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return not self._trial_running
+
+    def allow(self):
+        """Let a call through; in half_open this claims the single trial call."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[BREAKER] {self.name} recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"[BREAKER] {self.name} open for {self.cooldown:.0f}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        End an attempt that recorded no result (cancelled, lost a hedge,
+        abandoned), so a claimed trial does not block the breaker forever.
+        A no-op after record_success/record_failure.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_running = False
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+# ===============================
+# REGISTRY
+# ===============================
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+    """Return the shared breaker for `name`, creating it on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold, cooldown)
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states():
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
@@ -0,0 +1,137 @@
+import re
+import threading
+from collections import deque
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency: fall back to a character estimate
+    _encoding = None
+
+# ===============================
+# CONFIG
+# ===============================
+MAX_TOKENS = 16000      # history kept verbatim before folding into the summary
+SUMMARY_TOKENS = 400    # cap for the rolling summary
+MESSAGE_OVERHEAD = 4    # role/separator tokens per chat message
+SUMMARY_LINE_CHARS = 160
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+# ===============================
+# CONTEXT WINDOW
+# ===============================
+class ContextWindow:
+    """
+    Chat history with per-message token counts.
+
+    Behaves like the old `chat_history` list (append, extend, clear,
+    indexing, slicing, len, iteration) but:
+    - window(budget) returns the newest messages that fit a token budget,
+      so each provider gets as much history as it can take;
+    - once the verbatim history exceeds `max_tokens`, the oldest messages
+      are folded into a compact running summary, so memory and prompt
+      size stay bounded however long the session runs.
+    """
+
+    def __init__(self, max_tokens=MAX_TOKENS, summary_tokens=SUMMARY_TOKENS):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self._messages = deque()   # (message, tokens)
+        self._total = 0
+        self._summary = deque()    # (line, tokens)
+        self._summary_total = 0
+        self._lock = threading.RLock()
+
+    # -----------------------------
+    # LIST INTERFACE
+    # -----------------------------
+    def append(self, message):
+        tokens = count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+        with self._lock:
+            self._messages.append((message, tokens))
+            self._total += tokens
+            self._fold()
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def clear(self):
+        with self._lock:
+            self._messages.clear()
+            self._total = 0
+            self._summary.clear()
+            self._summary_total = 0
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        with self._lock:
+            return iter([m for m, _ in self._messages])
+
+    def __getitem__(self, index):
+        with self._lock:
+            messages = [m for m, _ in self._messages]
+        return messages[index]
+
+    @property
+    def tokens(self):
+        return self._total
+
+    # -----------------------------
+    # BUDGETED VIEW
+    # -----------------------------
+    def window(self, budget):
+        """Newest messages (chronological order) whose tokens fit `budget`."""
+        with self._lock:
+            picked, used = [], 0
+            for message, tokens in reversed(self._messages):
+                if picked and used + tokens > budget:
+                    break
+                picked.append(message)
+                used += tokens
+        picked.reverse()
+        return picked
+
+    @property
+    def summary(self):
+        with self._lock:
+            return "\n".join(line for line, _ in self._summary)
+
+    # -----------------------------
+    # ROLLING SUMMARY
+    # -----------------------------
+    def _fold(self):
+        # Keep at least the latest exchange verbatim
+        while self._total > self.max_tokens and len(self._messages) > 2:
+            message, tokens = self._messages.popleft()
+            self._total -= tokens
+            line = _summarize(message)
+            if not line:
+                continue
+            line_tokens = count_tokens(line)
+            self._summary.append((line, line_tokens))
+            self._summary_total += line_tokens
+            while self._summary_total > self.summary_tokens and len(self._summary) > 1:
+                _, dropped = self._summary.popleft()
+                self._summary_total -= dropped
+
+
+def _summarize(message):
+    """One short line per folded message: its first sentence, clipped."""
+    text = re.sub(r"\s+", " ", message.get("content", "")).strip()
+    if not text:
+        return ""
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return f"- {message.get('role', 'user')}: {first}"
@@ -1,16 +1,109 @@
 import sqlite3
 import datetime
+import gzip
+import json
 import os
-from typing import List, Dict
+import queue
+import atexit
+import threading
+import time
+from typing import List, Dict, Optional, Iterator
+from dotenv import dotenv_values
+import metrics
+
+env = dotenv_values(".env")
 
 DB_PATH = "tron_conversations.db"
 
+# Background writer: rows are inserted in batches of up to WRITE_BATCH,
+# at least every WRITE_INTERVAL seconds
+WRITE_BATCH = 256
+WRITE_INTERVAL = 0.25
+# Rows allowed to wait for the writer; past that log_message() blocks until
+# it catches up, so a burst cannot grow the queue (and flush()) without bound
+WRITE_QUEUE_MAX = 10000
+FLUSH_TIMEOUT = 10.0    # seconds flush() waits before giving up
+
+# Retention (0 = keep everything). Expired rows are appended to gzip NDJSON
+# archives, one file per month, before they are deleted.
+RETENTION_DAYS = int(env.get("HistoryRetentionDays", "0") or 0)
+RETENTION_MAX_ROWS = int(env.get("HistoryMaxRows", "0") or 0)
+ARCHIVE_DIR = env.get("HistoryArchivePath", "Data/history_archive")
+MAINTENANCE_INTERVAL = float(env.get("HistoryMaintenanceHours", "6") or 6) * 3600
+ARCHIVE_BATCH = 2000    # rows archived + deleted per (short) transaction
+VACUUM_STEP = 256       # free pages handed back per incremental_vacuum call
+
+DB_WRITE_SECONDS = metrics.histogram(
+    "tron_db_write_seconds", "One batched insert transaction of the log writer")
+DB_ROWS_WRITTEN = metrics.counter(
+    "tron_db_rows_written_total", "Conversation rows committed", ("result",))
+DB_WRITE_QUEUE = metrics.gauge(
+    "tron_db_write_queue", "Rows waiting for the log writer")
+
+INSERT_SQL = "INSERT INTO conversations (timestamp, speaker, message, language) VALUES (?, ?, ?, ?)"
+
+# Full-text index over `conversations.message` (external-content FTS5 table
+# kept in sync by triggers). False when this sqlite build lacks FTS5.
+FTS_AVAILABLE = False
+
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE conversations_fts USING fts5(
+        message,
+        content='conversations',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+        INSERT INTO conversations_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO conversations_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+]
+
+
+# ===============================
+# CONNECTIONS
+# ===============================
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Persistent per-thread connection (sqlite3 connections are not shared
+    across threads). WAL lets readers run while the writer commits, and
+    synchronous=NORMAL is durable enough for a chat log under WAL.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=10, cached_statements=256)
+        # Only takes effect on a new database (must precede journal_mode);
+        # older ones are converted by reclaim_space(full=True)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn = conn
+    return conn
+
 
 def init_db():
     """Create the database and table if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
+    conn = get_connection()
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS conversations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT NOT NULL,
@@ -19,31 +112,137 @@ def init_db():
         language TEXT  -- 'en', 'hi', 'te', 'ta' or detected code
     )
     ''')
+    # Back the time-range and language filters of the paginated history API
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_language ON conversations(language, id)")
     conn.commit()
-    conn.close()
+    init_fts(conn)
     print(f"[DB] Database ready at {os.path.abspath(DB_PATH)}")
 
 
+def init_fts(conn):
+    """Create the FTS5 index and triggers; backfill existing rows on first run."""
+    global FTS_AVAILABLE
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='conversations_fts'"
+    ).fetchone()
+    try:
+        with conn:
+            if not exists:
+                conn.execute(FTS_SCHEMA[0])
+            for statement in FTS_SCHEMA[1:]:
+                conn.execute(statement)
+            if not exists:
+                conn.execute("INSERT INTO conversations_fts(conversations_fts) VALUES('rebuild')")
+                print("[DB] Full-text index built from existing history")
+        FTS_AVAILABLE = True
+    except sqlite3.OperationalError as e:
+        print(f"[DB] FTS5 unavailable, search falls back to LIKE: {e}")
+        FTS_AVAILABLE = False
+
+
+# ===============================
+# BACKGROUND WRITER
+# ===============================
+class _LogWriter:
+    """Single thread that drains queued rows into batched transactions."""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=WRITE_QUEUE_MAX)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, row):
+        self._ensure_started()
+        self.queue.put(row)
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """
+        Block until every row queued before this call is committed; returns
+        False if that took longer than `timeout` seconds.
+        """
+        if self._thread is None:
+            return True
+        # Rows keep arriving under load; wait for a marker behind ours only
+        deadline = time.monotonic() + timeout
+        marker = threading.Event()
+        try:
+            self.queue.put(marker, timeout=timeout)
+        except queue.Full:
+            marker = None
+        if marker is None or not marker.wait(max(0.0, deadline - time.monotonic())):
+            print(f"[DB] Flush timed out after {timeout:.0f}s ({self.queue.qsize()} rows queued)")
+            return False
+        return True
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        conn = get_connection()
+        while True:
+            batch, markers = [], []
+            item = self.queue.get()
+            deadline = time.monotonic() + WRITE_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    # A flush is waiting: commit what we have now
+                    markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= WRITE_BATCH or remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    with DB_WRITE_SECONDS.time(), conn:
+                        conn.executemany(INSERT_SQL, batch)
+                    DB_ROWS_WRITTEN.inc(len(batch), result="ok")
+            except sqlite3.Error as e:
+                print(f"[DB] Failed to write {len(batch)} messages: {e}")
+                DB_ROWS_WRITTEN.inc(len(batch), result="error")
+            finally:
+                DB_WRITE_QUEUE.set(self.queue.qsize())
+                for marker in markers:
+                    marker.set()
+
+
+_writer = _LogWriter()
+atexit.register(_writer.flush)
+
+
+def flush():
+    """Wait (up to FLUSH_TIMEOUT) for queued log_message() rows to reach the database."""
+    return _writer.flush()
+
+
+# ===============================
+# PUBLIC API
+# ===============================
 def log_message(speaker: str, message: str, language: str = "en"):
-    """Log a single message to the database."""
+    """Queue a single message for the database (blocks only while the writer is WRITE_QUEUE_MAX rows behind)."""
     if not message.strip():
         return
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     timestamp = datetime.datetime.now().isoformat()
-    c.execute("INSERT INTO conversations (timestamp, speaker, message, language) VALUES (?, ?, ?, ?)",
-              (timestamp, speaker.lower(), message.strip(), language.lower()))
-    conn.commit()
-    conn.close()
+    _writer.submit((timestamp, speaker.lower(), message.strip(), (language or "en").lower()))
 
 
 def get_conversation_history(limit: int = 50) -> List[Dict]:
     """Get recent conversation history (latest first)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT timestamp, speaker, message, language FROM conversations ORDER BY id DESC LIMIT ?", (limit,))
+    flush()
+    c = get_connection().execute(
+        "SELECT timestamp, speaker, message, language FROM conversations ORDER BY id DESC LIMIT ?",
+        (limit,)
+    )
     rows = c.fetchall()
-    conn.close()
 
     history = []
     for row in reversed(rows):  # Reverse to chronological order
@@ -56,15 +255,309 @@ def get_conversation_history(limit: int = 50) -> List[Dict]:
     return history
 
 
+def _history_filters(since, until, language, speaker):
+    """WHERE clauses + params shared by the paginated readers."""
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if language:
+        clauses.append("language = ?")
+        params.append(language.lower())
+    if speaker:
+        clauses.append("speaker = ?")
+        params.append(speaker.lower())
+    return clauses, params
+
+
+def get_history_page(before_id: Optional[int] = None, after_id: Optional[int] = None,
+                     limit: int = 50, since: Optional[str] = None, until: Optional[str] = None,
+                     language: Optional[str] = None, speaker: Optional[str] = None) -> Dict:
+    """
+    One page of history, keyset-paginated on `id` (cost is O(page), not O(offset)).
+
+    - default / before_id: newest first, rows with id < before_id
+    - after_id: oldest first, rows with id > after_id
+    `since`/`until` are ISO timestamps (until is exclusive). `next_cursor`
+    is the id to pass back for the following page, or None on the last one.
+    """
+    flush()
+    clauses, params = _history_filters(since, until, language, speaker)
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+        order = "ASC"
+    else:
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        order = "DESC"
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    rows = get_connection().execute(
+        "SELECT id, timestamp, speaker, message, language FROM conversations"
+        f"{where} ORDER BY id {order} LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+    has_more = len(rows) > limit
+    items = [
+        {
+            "id": row[0],
+            "timestamp": row[1],
+            "speaker": row[2],
+            "message": row[3],
+            "language": row[4],
+        }
+        for row in rows[:limit]
+    ]
+    return {
+        "items": items,
+        "next_cursor": items[-1]["id"] if has_more else None,
+        "order": "oldest_first" if order == "ASC" else "newest_first",
+    }
+
+
+def iter_history(since: Optional[str] = None, until: Optional[str] = None,
+                 language: Optional[str] = None, speaker: Optional[str] = None,
+                 batch: int = 1000) -> Iterator[Dict]:
+    """
+    Stream matching rows oldest first, one keyset query per `batch` rows.
+    No cursor stays open between batches, so the generator can be resumed
+    from any thread (e.g. by a StreamingResponse) and memory stays flat.
+    """
+    last_id = 0
+    while True:
+        page = get_history_page(after_id=last_id, limit=batch, since=since, until=until,
+                                language=language, speaker=speaker)
+        yield from page["items"]
+        if page["next_cursor"] is None:
+            return
+        last_id = page["next_cursor"]
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word quoted, all required."""
+    words = text.split()
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def search_history(query: str, speaker: Optional[str] = None,
+                   language: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """
+    Ranked full-text search over logged messages (best match first).
+    Each result carries a `highlight` snippet with <mark>...</mark> around hits.
+    """
+    if not query or not query.strip():
+        return []
+    flush()
+    filters, params = [], []
+    if speaker:
+        filters.append("c.speaker = ?")
+        params.append(speaker.lower())
+    if language:
+        filters.append("c.language = ?")
+        params.append(language.lower())
+    extra = "".join(" AND " + f for f in filters)
+
+    if FTS_AVAILABLE:
+        sql = (
+            "SELECT c.id, c.timestamp, c.speaker, c.message, c.language, "
+            "snippet(conversations_fts, 0, '<mark>', '</mark>', '…', 24), bm25(conversations_fts) "
+            "FROM conversations_fts JOIN conversations c ON c.id = conversations_fts.rowid "
+            "WHERE conversations_fts MATCH ?" + extra +
+            " ORDER BY bm25(conversations_fts) LIMIT ?"
+        )
+        rows = get_connection().execute(sql, [_fts_query(query)] + params + [limit]).fetchall()
+    else:
+        sql = (
+            "SELECT c.id, c.timestamp, c.speaker, c.message, c.language, c.message, 0 "
+            "FROM conversations c WHERE c.message LIKE ?" + extra +
+            " ORDER BY c.id DESC LIMIT ?"
+        )
+        rows = get_connection().execute(sql, [f"%{query.strip()}%"] + params + [limit]).fetchall()
+
+    return [
+        {
+            "id": row[0],
+            "timestamp": row[1],
+            "speaker": row[2],
+            "message": row[3],
+            "language": row[4],
+            "highlight": row[5],
+            "rank": row[6],
+        }
+        for row in rows
+    ]
+
+
+# ===============================
+# RETENTION & MAINTENANCE
+# ===============================
+_maintenance_lock = threading.Lock()
+
+
+def _expired_filter(conn, max_age_days, max_rows):
+    """WHERE clause + params selecting rows past the retention policy."""
+    clauses, params = [], []
+    if max_age_days:
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=max_age_days)
+        clauses.append("timestamp < ?")
+        params.append(cutoff.isoformat())
+    if max_rows:
+        row = conn.execute(
+            "SELECT id FROM conversations ORDER BY id DESC LIMIT 1 OFFSET ?", (max_rows,)
+        ).fetchone()
+        if row:
+            clauses.append("id <= ?")
+            params.append(row[0])
+    return " OR ".join(clauses), params
+
+
+def _archive(rows):
+    """Append rows to ARCHIVE_DIR/conversations-YYYY-MM.ndjson.gz (one gzip member per call)."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row[1][:7], []).append(row)
+    for month, month_rows in by_month.items():
+        path = os.path.join(ARCHIVE_DIR, f"conversations-{month}.ndjson.gz")
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in month_rows:
+                f.write(json.dumps({
+                    "id": row[0],
+                    "timestamp": row[1],
+                    "speaker": row[2],
+                    "message": row[3],
+                    "language": row[4],
+                }, ensure_ascii=False) + "\n")
+
+
+def apply_retention(max_age_days: Optional[int] = None, max_rows: Optional[int] = None) -> int:
+    """
+    Archive, then delete, rows older than `max_age_days` or beyond the newest
+    `max_rows` (defaults: RETENTION_DAYS / RETENTION_MAX_ROWS; 0 = no limit).
+    Works in ARCHIVE_BATCH-row transactions so the log writer is never held
+    up for long. A batch is archived before it is deleted, so a crash in
+    between can only duplicate archive lines, never lose rows.
+    Returns the number of rows removed.
+    """
+    max_age_days = RETENTION_DAYS if max_age_days is None else max_age_days
+    max_rows = RETENTION_MAX_ROWS if max_rows is None else max_rows
+    if not max_age_days and not max_rows:
+        return 0
+
+    flush()
+    conn = get_connection()
+    where, params = _expired_filter(conn, max_age_days, max_rows)
+    if not where:
+        return 0
+
+    removed, last_id = 0, 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, timestamp, speaker, message, language FROM conversations "
+            f"WHERE id > ? AND ({where}) ORDER BY id LIMIT ?",
+            [last_id] + params + [ARCHIVE_BATCH]
+        ).fetchall()
+        if not rows:
+            break
+        _archive(rows)
+        with conn:
+            conn.execute(
+                f"DELETE FROM conversations WHERE id BETWEEN ? AND ? AND ({where})",
+                [rows[0][0], rows[-1][0]] + params
+            )
+        removed += len(rows)
+        last_id = rows[-1][0]
+
+    if removed:
+        print(f"[DB] Archived {removed} expired messages to {ARCHIVE_DIR}")
+    return removed
+
+
+def vacuum_incremental() -> int:
+    """Hand free pages back to the filesystem, VACUUM_STEP pages at a time."""
+    conn = get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    while True:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not before:
+            break
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP})").fetchall()
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if after >= before:
+            break
+        freed += before - after
+    return freed
+
+
+def reclaim_space(full: bool = False) -> Dict:
+    """
+    On-demand maintenance: apply retention (with archival), release free
+    pages incrementally and truncate the WAL. `full=True` runs a one-off
+    VACUUM instead, which also switches databases created before
+    incremental auto-vacuum over to it (this one does block writers).
+    """
+    with _maintenance_lock:
+        removed = apply_retention()
+        conn = get_connection()
+        if full:
+            flush()
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            freed = 0
+        else:
+            freed = vacuum_incremental()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {
+        "archived": removed,
+        "pages_freed": freed,
+        "size_bytes": os.path.getsize(DB_PATH),
+    }
+
+
+_maintenance_thread = None
+
+
+def start_maintenance(interval: float = MAINTENANCE_INTERVAL, also=()):
+    """
+    Run reclaim_space() every `interval` seconds on a daemon thread, then
+    each callable in `also` (housekeeping of other stores, e.g. the journal).
+    """
+    global _maintenance_thread
+    if _maintenance_thread is not None or interval <= 0:
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                reclaim_space()
+            except sqlite3.Error as e:
+                print(f"[DB] Maintenance failed: {e}")
+            for job in also:
+                try:
+                    job()
+                except Exception as e:
+                    print(f"[DB] Maintenance job {getattr(job, '__name__', job)} failed: {e}")
+
+    _maintenance_thread = threading.Thread(target=loop, daemon=True)
+    _maintenance_thread.start()
+
+
 def clear_history():
     """Clear all conversation history (optional command)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM conversations")
-    conn.commit()
-    conn.close()
+    flush()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM conversations")
     print("[DB] Conversation history cleared.")
 
 
 # Initialize on import
-init_db()
\ No newline at end of file
+init_db()
@@ -0,0 +1,266 @@
+import os
+import json
+import atexit
+import tempfile
+import threading
+import metrics
+
+# ===============================
+# CONFIG
+# ===============================
+COMPACT_EVERY = 5000     # appends between background compactions
+MAX_ENTRIES = None       # keep everything unless a cap is configured
+READ_BLOCK = 64 * 1024   # block size for reverse tail reads
+
+MEMORY_IO_SECONDS = metrics.histogram(
+    "tron_memory_io_seconds", "Memory file and journal I/O", ("op",))
+
+
+# ===============================
+# CONVERSATION JOURNAL
+# ===============================
+class ConversationJournal:
+    """
+    Append-only JSONL log of conversation turns (one JSON object per line).
+
+    - append() writes a single line, O(1) regardless of file size.
+    - tail(n) reads blocks backwards from the end of the file, so startup
+      only touches the last few turns.
+    - compact() rewrites the file without torn/corrupt lines, trims it to
+      max_entries when set and drops entries for which `keep(entry)` is
+      false (e.g. a retention age). It runs on a background thread every
+      `compact_every` appends and never blocks writers for the bulk copy.
+    """
+
+    def __init__(self, path, compact_every=COMPACT_EVERY, max_entries=MAX_ENTRIES, keep=None):
+        self.path = path
+        self.compact_every = compact_every
+        self.max_entries = max_entries
+        self.keep = keep
+        self._fh = None
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._compacting = False
+        self._compact_lock = threading.Lock()   # held for a whole compaction
+        atexit.register(self.close)
+
+    # -----------------------------
+    # WRITE
+    # -----------------------------
+    def _handle(self):
+        if self._fh is None:
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if torn:
+                # Terminate a line left half-written by a crash
+                self._fh.write("\n")
+        return self._fh
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, MEMORY_IO_SECONDS.time(op="journal_append"):
+            fh = self._handle()
+            fh.write(line)
+            fh.flush()
+            self._appends += 1
+            due = self.compact_every and self._appends >= self.compact_every
+        if due:
+            self.compact_async()
+
+    def extend(self, entries):
+        with self._lock:
+            fh = self._handle()
+            for entry in entries:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            fh.flush()
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    def is_empty(self):
+        return not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+    def __iter__(self):
+        """Stream every entry from oldest to newest."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = _parse(line)
+                if entry is not None:
+                    yield entry
+
+    def _tail_offset(self, f, n):
+        """
+        Byte offset where the last `n` entries of an open binary file start.
+        Torn or corrupt lines are skipped, they do not count toward `n`.
+        """
+        pos = f.seek(0, os.SEEK_END)
+        carry = b""
+        found = 0
+        while pos > 0:
+            step = min(READ_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step) + carry
+            lines = block.split(b"\n")
+            # The first piece may be the tail of a line from an earlier block
+            carry = lines.pop(0)
+            end = pos + len(block)
+            for line in reversed(lines):
+                start = end - len(line)
+                if _parse(line.decode("utf-8", errors="replace")) is not None:
+                    found += 1
+                    if found == n:
+                        return start
+                end = start - 1
+        return 0
+
+    def tail(self, n, match=None, scan_limit=None):
+        """
+        Return the last `n` entries (oldest first) reading only the file end.
+        With `match`, only entries for which match(entry) is true count;
+        `scan_limit` caps how many lines are examined walking backwards.
+        """
+        if n <= 0 or not os.path.exists(self.path):
+            return []
+        with MEMORY_IO_SECONDS.time(op="journal_tail"):
+            return self._tail(n, match, scan_limit)
+
+    def _tail(self, n, match, scan_limit):
+        if match is None:
+            with open(self.path, "rb") as f:
+                f.seek(self._tail_offset(f, n))
+                lines = f.read().decode("utf-8", errors="replace").splitlines()
+            entries = [e for e in (_parse(line) for line in lines) if e is not None]
+            return entries[-n:]
+
+        entries = []
+        for scanned, entry in enumerate(self.iter_reverse()):
+            if scan_limit is not None and scanned >= scan_limit:
+                break
+            if match(entry):
+                entries.append(entry)
+                if len(entries) == n:
+                    break
+        entries.reverse()
+        return entries
+
+    def iter_reverse(self):
+        """Stream entries from newest to oldest, reading blocks backwards."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            pos = f.seek(0, os.SEEK_END)
+            carry = b""
+            while pos > 0:
+                step = min(READ_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                lines = (f.read(step) + carry).split(b"\n")
+                # The first piece may be the tail of a line from an earlier block
+                carry = lines.pop(0)
+                for line in reversed(lines):
+                    entry = _parse(line.decode("utf-8", errors="replace"))
+                    if entry is not None:
+                        yield entry
+            entry = _parse(carry.decode("utf-8", errors="replace"))
+            if entry is not None:
+                yield entry
+
+    # -----------------------------
+    # COMPACTION
+    # -----------------------------
+    def compact_async(self):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+            self._appends = 0
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        """Rewrite the journal atomically, dropping corrupt, expired and overflow lines."""
+        # One at a time: a second swap would read the replaced file during its
+        # catch-up and lose whatever was appended after the first one
+        with self._compact_lock:
+            return self._compact()
+
+    def _compact(self):
+        with self._lock:
+            self._compacting = True
+            if self._fh is not None:
+                self._fh.flush()
+        try:
+            if not os.path.exists(self.path):
+                return 0
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".journal_", suffix=".tmp", dir=directory)
+            kept = 0
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as out, open(self.path, "rb") as src:
+                    if self.max_entries:
+                        src.seek(self._tail_offset(src, self.max_entries))
+                    end = os.path.getsize(self.path)
+
+                    # Bulk copy without holding the lock; appends keep going
+                    while src.tell() < end:
+                        kept += _copy_line(src.readline(), out, self.keep)
+
+                    # Catch up with whatever was appended meanwhile, then swap
+                    with self._lock:
+                        if self._fh is not None:
+                            self._fh.flush()
+                        for line in src:
+                            kept += _copy_line(line, out, self.keep)
+                        out.flush()
+                        os.fsync(out.fileno())
+                        if self._fh is not None:
+                            self._fh.close()
+                            self._fh = None
+                        os.replace(tmp_path, self.path)
+                        tmp_path = None
+            finally:
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+            print(f"[JOURNAL] Compacted {self.path} ({kept} entries)")
+            return kept
+        except OSError as e:
+            print(f"[JOURNAL] Compaction failed: {e}")
+            return 0
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+# ===============================
+# HELPERS
+# ===============================
+def _parse(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _copy_line(raw, out, keep=None):
+    entry = _parse(raw.decode("utf-8", errors="replace"))
+    if entry is None or (keep is not None and not keep(entry)):
+        return 0
+    out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return 1
@@ -0,0 +1,82 @@
+import re
+import threading
+
+
+# ===============================
+# FACT EXTRACTOR
+# ===============================
+class FactExtractor:
+    """
+    Registry of fact patterns, each compiled once.
+
+    Every rule is a pattern with exactly one capturing group plus the fact
+    key it fills. Each rule also has a literal keyword (by default the
+    text its pattern starts with, e.g. "my name is "): a rule is only
+    searched when its keyword occurs in the lowercased text, so ordinary
+    chat with no facts costs a few substring checks instead of a regex
+    search per rule.
+    When several rules fill the same key, the later-registered one wins.
+    """
+
+    def __init__(self, rules=None):
+        self._rules = []   # (keyword, compiled, key, transform)
+        self._lock = threading.Lock()
+        for pattern, key in rules or []:
+            self.register(pattern, key)
+
+    def register(self, pattern, key, transform=None, keyword=None):
+        compiled = re.compile(pattern, re.IGNORECASE)
+        if compiled.groups != 1:
+            raise ValueError(f"Fact pattern must have exactly one group: {pattern!r}")
+        keyword = _leading_literal(pattern) if keyword is None else keyword.lower()
+        with self._lock:
+            self._rules = self._rules + [(keyword, compiled, key, transform or _clean)]
+
+    # -----------------------------
+    # EXTRACTION
+    # -----------------------------
+    def extract(self, text):
+        """Return {key: value} for every fact found in `text`."""
+        rules = self._rules
+        if not text or not rules:
+            return {}
+        lowered = text.lower()
+        facts = {}
+        for keyword, compiled, key, transform in rules:
+            if keyword not in lowered:
+                continue
+            match = compiled.search(text)
+            if match:
+                facts[key] = transform(match.group(1))
+        return facts
+
+    def rebuild(self, texts):
+        """Fold facts from many texts in order (later mentions win)."""
+        facts = {}
+        for text in texts:
+            facts.update(self.extract(text))
+        return facts
+
+
+# ===============================
+# HELPERS
+# ===============================
+def _clean(value):
+    return value.strip().title()
+
+
+_META = set("\\.^$*+?{}[]|()")
+
+
+def _leading_literal(pattern):
+    """Lowercased literal text `pattern` starts with ("" if none)."""
+    if pattern.startswith("\\b"):
+        pattern = pattern[2:]
+    literal = []
+    for char in pattern:
+        if char in _META:
+            if char in "?*{" and literal:
+                literal.pop()   # the last char is optional
+            break
+        literal.append(char)
+    return "".join(literal).lower()
@@ -0,0 +1,98 @@
+import re
+import threading
+from collections import Counter
+import metrics
+
+# ===============================
+# CONFIG
+# ===============================
+DEFAULT_PRIORITY = 100
+FALLBACK_PATH = "llm"   # counter for queries no local handler answered
+
+INTENT_REQUESTS = metrics.counter(
+    "tron_intent_requests_total", "Queries by the path that served them", ("path",))
+
+
+# ===============================
+# INTENT ROUTER
+# ===============================
+class IntentRouter:
+    """
+    Priority-ordered registry of local intent handlers.
+
+    Each route is a regex (compiled once, case-insensitive) and a handler
+    called as handler(match, query, *args). A handler answers by returning
+    a reply, or returns None to let lower-priority routes (and finally the
+    LLM chain) have the query. Lower priority numbers run first; routes
+    with equal priority keep their registration order.
+
+    All patterns are also joined into one alternation, so a query that no
+    route can match costs a single regex scan before it goes to the LLM.
+    dispatch() counts which path served every query (see stats()).
+    """
+
+    def __init__(self):
+        self._routes = []       # (priority, order, name, compiled, handler)
+        self._any = None
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def register(self, name, pattern, handler, priority=DEFAULT_PRIORITY):
+        compiled = re.compile(pattern, re.IGNORECASE)
+        with self._lock:
+            self._routes.append((priority, len(self._routes), name, compiled, handler))
+            self._routes.sort(key=lambda route: route[:2])
+            self._any = None
+
+    def route(self, name, pattern, priority=DEFAULT_PRIORITY):
+        """Decorator form of register()."""
+        def decorator(handler):
+            self.register(name, pattern, handler, priority)
+            return handler
+        return decorator
+
+    def _gate(self):
+        with self._lock:
+            if self._any is None:
+                self._any = re.compile(
+                    "|".join(f"(?:{compiled.pattern})" for *_, compiled, _ in self._routes) or "(?!)",
+                    re.IGNORECASE
+                )
+            return self._any, list(self._routes)
+
+    # -----------------------------
+    # DISPATCH
+    # -----------------------------
+    def dispatch(self, query, *args):
+        """
+        Return (route name, reply) from the first route that answers, or
+        (None, None) when the query should go to the LLM.
+        """
+        gate, routes = self._gate()
+        if gate.search(query):
+            for _, _, name, compiled, handler in routes:
+                match = compiled.search(query)
+                if match is None:
+                    continue
+                reply = handler(match, query, *args)
+                if reply is not None:
+                    self.record(name)
+                    return name, reply
+        self.record(FALLBACK_PATH)
+        return None, None
+
+    def record(self, path):
+        with self._lock:
+            self._counts[path] += 1
+        INTENT_REQUESTS.inc(path=path)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            names = [name for _, _, name, _, _ in self._routes]
+        total = sum(counts.values())
+        return {
+            "routes": names,
+            "served": counts,
+            "local_rate": round(1 - counts.get(FALLBACK_PATH, 0) / total, 4) if total else 0.0,
+        }
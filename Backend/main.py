@@ -1,23 +1,51 @@
+import os
+import sys
+from startup_profiler import StartupProfiler
+
+# python main.py --profile-startup (or TRON_PROFILE_STARTUP=1 under uvicorn)
+profiler = StartupProfiler(
+    enabled="--profile-startup" in sys.argv or os.environ.get("TRON_PROFILE_STARTUP") == "1"
+)
+profiler.install()
+
+import asyncio
+import json
+import datetime
+import re
 import threading
+from collections import OrderedDict
 import time
 import traceback
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Query as QueryParam, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
-import cv2
 
 # ===============================
 # CORE MODULES
 # ===============================
-from voice_module import TronAssistant
-from Tron_Chatbot import ChatBot
+# Vision stacks (cv2, ultralytics, mediapipe, deepface) are imported
+# inside the vision threads, only when vision is enabled.
+from voice_module import detect_language_switch, LANG_CONFIRM
+from Tron_Chatbot import (
+    ChatBotStreamAsync, CacheStats, CloseAsyncClients, CompactJournal, GetSession, SessionStats,
+    RecallFact
+)
+from intent_router import IntentRouter
+from admission import AdmissionController, Overloaded
+from ws_hub import ConnectionHub
+from circuit_breaker import breaker_states
+import metrics
 from Reminder import Reminder
-from conversation_db import log_message, get_conversation_history, clear_history
-from text_to_speech import TextToSpeech  # ← gTTS + pyttsx3 fallback chain
-from hand_mouse_cursor import HandMouseCursor
-from perception_engine import PerceptionEngine
-from object_detector import ObjectDetector
+from conversation_db import (
+    log_message, get_conversation_history, clear_history, search_history,
+    get_history_page, iter_history, reclaim_space, start_maintenance
+)
+from text_to_speech import TextToSpeech, PRIORITY_SYSTEM, PRIORITY_ANNOUNCE  # ← Piper (offline) + gTTS fallback chain
+from tts_engines import audio_type
 from auth import TronAuth
 
 # ===============================
@@ -26,13 +54,56 @@ from auth import TronAuth
 API_HOST = "127.0.0.1"
 API_PORT = 8000
 FRONTEND_URL = "http://localhost:3000"
+VISION_ENABLED = "--no-vision" not in sys.argv
+
+# ===============================
+# METRICS
+# ===============================
+REQUEST_SECONDS = metrics.histogram(
+    "tron_request_seconds", "End-to-end chat request time", ("endpoint",))
+VISION_FRAME_SECONDS = metrics.histogram(
+    "tron_vision_frame_seconds", "Time per vision loop iteration", ("thread",))
+VISION_FPS = metrics.gauge(
+    "tron_vision_fps", "Smoothed frames per second of each vision thread", ("thread",))
+CACHE_HIT_RATE = metrics.gauge(
+    "tron_response_cache_hit_rate", "Response cache hit rate")
+SESSIONS_LIVE = metrics.gauge(
+    "tron_sessions_live", "Sessions held in memory")
+BREAKER_OPEN = metrics.gauge(
+    "tron_breaker_open", "1 while a provider/model circuit breaker is not closed", ("name",))
 
 # ===============================
 # GLOBAL STATE
 # ===============================
-tron = TronAssistant()
-tts = TextToSpeech()  # ← Reliable gTTS with fallbacks
+# TextToSpeech loads the Piper voice itself (voice_module's TronAssistant is
+# only for standalone scripts, so the model is not loaded twice)
+with profiler.measure("TextToSpeech()"):
+    tts = TextToSpeech()  # ← Offline Piper, gTTS as fallback
 reminder = Reminder()
+# Bounded, per-client fair queue in front of the chat endpoints
+admission = AdmissionController()
+# Open /ws connections; speech status and reminders are pushed through it
+hub = ConnectionHub()
+# Sessions whose reply each clip is, so its speech status only reaches them
+# (vision/system announcements belong to no web session and are not pushed)
+speech_sessions = OrderedDict()   # audio id -> set of session ids
+speech_lock = threading.Lock()
+SPEECH_SESSIONS_MAX = 256
+
+
+def publish_speech(status: str, audio_id: str):
+    with speech_lock:
+        targets = set(speech_sessions.get(audio_id, ()))
+        if status != "started":
+            speech_sessions.pop(audio_id, None)
+    for session_id in targets:
+        hub.publish({"type": "speech", "status": status, "audio_id": audio_id}, session_id=session_id)
+
+
+tts.listeners.append(publish_speech)
+reminder.listeners.append(
+    lambda message: hub.publish({"type": "notification", "kind": "reminder", "message": message})
+)
 
 # Vision modules
 hand_mouse = perception = object_detector = None
@@ -48,71 +119,235 @@ def authenticate():
 # ===============================
 # COMMAND HANDLER
 # ===============================
-def handle_command(command: str) -> str:
+# Local intents are answered without the LLM (see intent_router.py).
+# Handlers return (reply, text to speak), or None to pass the query on;
+# nothing is spoken here: the caller speaks once per reply.
+router = IntentRouter()
+
+
+@router.route("language", r"english|hindi|इंग्लिश|हिंदी", priority=10)
+def switch_language(match, command, session):
+    new_lang = detect_language_switch(command)
+    if not new_lang or new_lang == session.lang:
+        return None
+    session.lang = new_lang
+    tts.prepare(new_lang)   # warm the voice before the first reply in it
+    confirm = LANG_CONFIRM.get(new_lang, "Language updated.")
+    log_message("tron", confirm, new_lang)
+    return confirm, confirm
+
+
+@router.route("clear_history", r"clear history", priority=20)
+def clear_history_command(match, command, session):
+    clear_history()
+    session.history.clear()
+    reply = "Conversation history cleared."
+    log_message("tron", reply, session.lang)
+    return reply, reply
+
+
+@router.route("show_history", r"show history", priority=20)
+def show_history_command(match, command, session):
+    history = get_conversation_history(10)
+    reply = "Recent conversation:\n" + "\n".join(
+        f"{h['speaker'].title()}: {h['message']}" for h in history[-10:]
+    ) if history else "No history yet."
+    log_message("tron", reply, session.lang)
+    return reply, "Check console for recent history."
+
+
+@router.route("reclaim_history", r"clean ?up history|reclaim space", priority=20)
+def reclaim_history_command(match, command, session):
+    result = reclaim_history_space()
+    reply = (f"History maintenance done: archived {result['archived']} old messages, "
+             f"database is {result['size_bytes'] // 1024} KB.")
+    log_message("tron", reply, session.lang)
+    return reply, "History cleaned up."
+
+
+SEARCH_HISTORY_PATTERN = r"^\s*search history(?:\s+for)?\s*(.*)"
+_search_history_re = re.compile(SEARCH_HISTORY_PATTERN, re.IGNORECASE)
+
+
+def _is_search_turn(hit) -> bool:
+    """A row logged by a history search itself: the command or its reply."""
+    if hit["speaker"] == "user":
+        return _search_history_re.search(hit["message"]) is not None
+    return hit["message"].startswith(("Matches:\n", "Nothing in history matches '"))
+
+
+@router.route("search_history", SEARCH_HISTORY_PATTERN, priority=20)
+def search_history_command(match, command, session):
+    terms = match.group(1).strip()
+    # The command was just logged and earlier searches echo the terms: skip those
+    hits = [hit for hit in search_history(terms, limit=25) if not _is_search_turn(hit)][:5]
+    reply = "Matches:\n" + "\n".join(
+        f"[{h['timestamp'][:16]}] {h['speaker'].title()}: {h['message']}" for h in hits
+    ) if hits else f"Nothing in history matches '{terms}'."
+    log_message("tron", reply, session.lang)
+    return reply, f"Found {len(hits)} matches." if hits else "No matches found."
+
+
+@router.route("set_reminder", r"^\s*remind me\b", priority=30)
+def set_reminder_command(match, command, session):
+    success, msg = reminder.set_reminder(command)
+    log_message("tron", msg, session.lang)
+    return msg, msg
+
+
+@router.route("list_reminders", r"\b(?:list|show|what are|any) (?:my |all )?reminders\b", priority=30)
+def list_reminders_command(match, command, session):
+    pending = reminder.list_reminders()
+    if not pending:
+        reply = "You have no pending reminders."
+    else:
+        reply = "Pending reminders:\n" + "\n".join(
+            f"- {message} (in {_format_delay(left)})" for message, left in pending
+        )
+    log_message("tron", reply, session.lang)
+    return reply, reply if not pending else f"You have {len(pending)} pending reminders."
+
+
+@router.route("time", r"^\W*(?:what(?:'s| is) the (?:current )?time|what time is it|tell me the time|current time)"
+                      r"(?: now| right now)?\W*$", priority=40)
+def time_command(match, command, session):
+    reply = f"It's {datetime.datetime.now().strftime('%I:%M %p').lstrip('0')}."
+    log_message("tron", reply, session.lang)
+    return reply, reply
+
+
+@router.route("date", r"^\W*(?:what(?:'s| is) (?:the |today's )?date(?: today)?|what day is (?:it|today)"
+                      r"|today's date)\W*$", priority=40)
+def date_command(match, command, session):
+    reply = f"Today is {datetime.datetime.now().strftime('%A, %B %d, %Y')}."
+    log_message("tron", reply, session.lang)
+    return reply, reply
+
+
+@router.route("fact", r"^\W*(?:what(?:'s| is)|what do|where do|do you (?:know|remember))\b.*\b(?:my|i)\b",
+              priority=50)
+def fact_command(match, command, session):
+    fact = RecallFact(command)
+    if fact is None:
+        return None
+    log_message("tron", fact, session.lang)
+    return fact, fact
+
+
+@router.route("exit", r"\b(?:exit|bye|goodbye|shutdown)\b", priority=90)
+def exit_command(match, command, session):
+    reply = "Goodbye disabled in web mode."
+    return reply, reply
+
+
+def _format_delay(seconds: int) -> str:
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def run_special_command(command: str, session):
+    """Answer a local intent. Returns (reply, text to speak), or None for the chatbot."""
+    _, answer = router.dispatch(command, session)
+    return answer
+
+
+def reclaim_history_space(full: bool = False) -> dict:
+    """Retention + archival + space reclaim for the database and the journal."""
+    result = reclaim_space(full=full)
+    result["journal_entries"] = CompactJournal()
+    return result
+
+
+async def handle_command_stream(command: str, result: dict, session):
+    """
+    Yield the reply chunk by chunk (chatbot answers stream as generated).
+    The final reply is stored in result["reply"] and the text to speak for
+    it in result["speech"]; speaking is left to the caller.
+    """
     try:
         command = command.strip()
         if not command:
-            return "Please say something."
-
-        log_message("user", command, tron.current_lang)
-
-        # Language switch
-        lang_result = tron.switch_language(command)
-        if lang_result[0]:
-            new_lang, confirm = lang_result
-            tts.set_language(new_lang)
-            log_message("tron", confirm, new_lang)
-            tts.speak(confirm)
-            return confirm
-
-        # Special commands
-        if "clear history" in command.lower():
-            clear_history()
-            reply = "Conversation history cleared."
-            log_message("tron", reply, tron.current_lang)
-            tts.speak(reply)
-            return reply
-
-        if "show history" in command.lower():
-            history = get_conversation_history(10)
-            reply = "Recent conversation:\n" + "\n".join(
-                f"{h['speaker'].title()}: {h['message']}" for h in history[-10:]
-            ) if history else "No history yet."
-            log_message("tron", reply, tron.current_lang)
-            tts.speak("Check console for recent history.")
-            return reply
-
-        if command.lower().startswith("remind me"):
-            success, msg = reminder.set_reminder(command)
-            log_message("tron", msg, tron.current_lang)
-            tts.speak(msg)
-            return msg
-
-        if any(p in command.lower() for p in ["exit", "bye", "shutdown"]):
-            reply = "Goodbye disabled in web mode."
-            tts.speak(reply)
-            return reply
-
-        # Chatbot response
-        response = ChatBot(command)
-        log_message("tron", response, tron.current_lang)
-        return response
+            result["reply"] = result["speech"] = "Please say something."
+            yield result["reply"]
+            return
+
+        log_message("user", command, session.lang)
+
+        # Built-in commands touch sqlite/tk/files: keep them off the event loop
+        special = await run_in_threadpool(run_special_command, command, session)
+        if special is not None:
+            result["reply"], result["speech"] = special
+            yield result["reply"]
+            return
+
+        turn = {}
+        async for chunk in ChatBotStreamAsync(command, turn, session):
+            yield chunk
+        result["reply"] = result["speech"] = turn["reply"]
+        log_message("tron", turn["reply"], session.lang)
 
     except Exception as e:
         traceback.print_exc()
         error = "TRON encountered an error."
-        log_message("tron", error, tron.current_lang)
-        return error
+        log_message("tron", error, session.lang)
+        result["reply"] = result["speech"] = error
+        yield error
+
+
+async def handle_command(command: str, session) -> dict:
+    """Run a command to completion; returns {"reply": ..., "speech": ...}."""
+    result = {}
+    async for _ in handle_command_stream(command, result, session):
+        pass
+    return result
+
+
+def speak_reply(speech: str, session) -> dict:
+    """Speak a reply once; the audio stays fetchable at /audio/{audio_id}."""
+    # Register the session before queueing: playback may start right away
+    audio_id = tts.clip_for(speech, session.lang)
+    if audio_id is not None:
+        with speech_lock:
+            speech_sessions.setdefault(audio_id, set()).add(session.id)
+            speech_sessions.move_to_end(audio_id)
+            while len(speech_sessions) > SPEECH_SESSIONS_MAX:
+                speech_sessions.popitem(last=False)
+    audio_id = tts.speak(speech, session.lang)
+    if audio_id is None:
+        return {}
+    return {"audio_id": audio_id, "audio_url": f"/audio/{audio_id}"}
 
 # ===============================
 # VISION THREADS
 # ===============================
+def frame_meter(thread: str):
+    """Returns tick(); call it once per frame to feed the vision FPS metrics."""
+    state = {"last": None, "fps": 0.0}
+
+    def tick():
+        now = time.perf_counter()
+        if state["last"] is not None:
+            elapsed = max(now - state["last"], 1e-6)
+            VISION_FRAME_SECONDS.observe(elapsed, thread=thread)
+            fps = 1 / elapsed
+            state["fps"] = fps if not state["fps"] else 0.9 * state["fps"] + 0.1 * fps
+            VISION_FPS.set(round(state["fps"], 2), thread=thread)
+        state["last"] = now
+    return tick
+
 def run_hand_mouse():
     global hand_mouse
+    import cv2
+    from hand_mouse_cursor import HandMouseCursor
     try:
         hand_mouse = HandMouseCursor()
-        tts.speak("Hand gesture control activated.")
+        tts.speak("Hand gesture control activated.", priority=PRIORITY_SYSTEM)
+        tick = frame_meter("hand_mouse")
         while True:
+            tick()
             frame = hand_mouse.tick()
             if frame is None: break
             cv2.imshow("TRON Hand Mouse", frame)
@@ -123,17 +358,21 @@ def run_hand_mouse():
 
 def run_perception():
     global perception
+    import cv2
+    from perception_engine import PerceptionEngine
     try:
         perception = PerceptionEngine()
-        tts.speak("Vision perception online.")
+        tts.speak("Vision perception online.", priority=PRIORITY_SYSTEM)
+        tick = frame_meter("perception")
         while True:
+            tick()
             obj, emotion, frame = perception.tick()
             if frame is None: break
             if obj:
-                tts.speak(f"I see a {obj}")
+                tts.speak(f"I see a {obj}", priority=PRIORITY_ANNOUNCE)
             if emotion:
                 emo, _ = emotion
-                tts.speak(f"You seem {emo}")
+                tts.speak(f"You seem {emo}", priority=PRIORITY_ANNOUNCE)
             cv2.imshow("TRON Perception", frame)
             if cv2.waitKey(1) == ord('q'): break
     finally:
@@ -141,14 +380,18 @@ def run_perception():
 
 def run_object_detector():
     global object_detector
+    import cv2
+    from object_detector import ObjectDetector
     try:
         object_detector = ObjectDetector()
-        tts.speak("Object detection ready.")
+        tts.speak("Object detection ready.", priority=PRIORITY_SYSTEM)
+        tick = frame_meter("object_detector")
         while True:
+            tick()
             obj, frame = object_detector.detect()
             if frame is None: break
             if obj:
-                tts.speak(f"Detected {obj}")
+                tts.speak(f"Detected {obj}", priority=PRIORITY_ANNOUNCE)
             cv2.imshow("TRON Objects", frame)
             if cv2.waitKey(1) == ord('q'): break
     finally:
@@ -157,32 +400,270 @@ def run_object_detector():
 # ===============================
 # FASTAPI
 # ===============================
-app = FastAPI(title="TRON v8.0 - gTTS + Fallback", version="8.0")
+app = FastAPI(title="TRON v8.0 - Piper + gTTS Fallback", version="8.0")
 
 app.add_middleware(CORSMiddleware, allow_origins=[FRONTEND_URL], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 class Query(BaseModel):
     message: str
+    session_id: Optional[str] = None
+
+def resolve_session(data: Query, header_id: Optional[str]):
+    # Body field wins over the X-Session-Id header; neither -> shared default.
+    # An unknown id may be rehydrated from the journal: async callers run
+    # this in the threadpool
+    return GetSession(data.session_id or header_id)
+
+def client_key(data: Query, header_id: Optional[str], request: Request) -> str:
+    # Fair queuing unit: the browser session, else the caller's address
+    if data.session_id or header_id:
+        return data.session_id or header_id
+    return request.client.host if request.client else "anonymous"
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("startup")
+def report_startup_profile():
+    # Under `uvicorn main:app` there is no __main__ block to print it
+    profiler.report()
+
+@app.on_event("startup")
+def start_history_maintenance():
+    # The journal gets the same periodic retention as the database
+    start_maintenance(also=[CompactJournal])
+
+@app.on_event("shutdown")
+async def close_provider_clients():
+    await CloseAsyncClients()
 
 @app.get("/")
 def root():
     return {
         "status": "TRON v8.0 Online",
-        "voice": "gTTS (Google) with pyttsx3 offline fallback",
+        "voice": "Piper (offline) with gTTS (Google) fallback",
         "say": "Hold mic to talk — I always speak back!"
     }
 
+@app.get("/stats")
+def stats_api():
+    return {
+        "response_cache": CacheStats(),
+        "sessions": SessionStats(),
+        "intents": router.stats(),
+        "admission": admission.stats(),
+        "websockets": hub.stats(),
+        "tts": tts.stats(),
+    }
+
+@app.get("/metrics")
+def metrics_api():
+    """Prometheus text format: stage latency histograms plus a few point-in-time gauges."""
+    CACHE_HIT_RATE.set(CacheStats()["hit_rate"])
+    SESSIONS_LIVE.set(SessionStats()["live"])
+    for name, state in breaker_states().items():
+        BREAKER_OPEN.set(int(state["state"] != "closed"), name=name)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/tron")
-def tron_api(data: Query):
-    reply = handle_command(data.message)
-    tts.speak(reply)
-    return {"reply": reply}
+async def tron_api(data: Query, request: Request, x_session_id: Optional[str] = Header(None)):
+    # Raises Overloaded (429/503 + Retry-After) instead of queueing without bound
+    ticket = await admission.acquire(client_key(data, x_session_id, request))
+    try:
+        session = await run_in_threadpool(resolve_session, data, x_session_id)
+        with REQUEST_SECONDS.time(endpoint="/tron"):
+            result = await handle_command(data.message, session)
+    finally:
+        ticket.release()
+    return {"reply": result["reply"], **speak_reply(result["speech"], session)}
+
+def sse_event(payload: dict, event: str = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return head + f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+class AdmittedStream(StreamingResponse):
+    """Streaming response that holds an admission ticket until it is done sending."""
+
+    def __init__(self, ticket, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        # Also covers a client gone before the body generator ever started
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+@app.post("/tron/stream")
+async def tron_stream_api(data: Query, request: Request, x_session_id: Optional[str] = Header(None)):
+    """Server-Sent Events: one `data: {"token": ...}` per chunk, then `event: done`."""
+    # Admission happens before the 200 so overload still gets a real 429/503;
+    # the slot is held until the stream ends
+    ticket = await admission.acquire(client_key(data, x_session_id, request))
+    try:
+        session = await run_in_threadpool(resolve_session, data, x_session_id)
+
+        async def events():
+            result = {}
+            try:
+                with REQUEST_SECONDS.time(endpoint="/tron/stream"):
+                    async for chunk in handle_command_stream(data.message, result, session):
+                        yield sse_event({"token": chunk})
+            finally:
+                ticket.release()
+            audio = speak_reply(result["speech"], session)
+            yield sse_event({"reply": result["reply"], **audio}, event="done")
+
+        return AdmittedStream(
+            ticket,
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except BaseException:
+        # Nothing will stream: give the slot back now
+        ticket.release()
+        raise
+
+@app.websocket("/ws")
+async def ws_api(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    One connection for chat and push events, JSON frames both ways.
+    Client -> server: {"type": "message", "id": ..., "text": ...}, {"type": "ping"}.
+    Server -> client: token / done / error (tagged with the message id),
+    speech {"status", "audio_id"}, notification, pong.
+    """
+    # CORS does not cover WebSockets: check the Origin ourselves
+    origin = websocket.headers.get("origin")
+    if origin not in (None, "null", FRONTEND_URL):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    # May rehydrate from the journal: keep it off the event loop
+    session = await run_in_threadpool(GetSession, session_id)
+    client = session_id or (websocket.client.host if websocket.client else "anonymous")
+    conn_id, outbox = hub.connect(session.id)
+    turn_lock = asyncio.Lock()   # one reply at a time per connection, in order
+    tasks = set()
+
+    async def pump():
+        # Single writer: every frame for this socket goes through the outbox
+        while True:
+            await websocket.send_json(await outbox.get())
+
+    async def answer(message_id, text):
+        async with turn_lock:
+            try:
+                ticket = await admission.acquire(client)
+            except Overloaded as e:
+                outbox.put_nowait({"type": "error", "id": message_id, "status": e.status,
+                                   "detail": e.reason, "retry_after": e.retry_after})
+                return
+            result = {}
+            try:
+                with REQUEST_SECONDS.time(endpoint="/ws"):
+                    async for chunk in handle_command_stream(text, result, session):
+                        outbox.put_nowait({"type": "token", "id": message_id, "token": chunk})
+            finally:
+                ticket.release()
+            audio = speak_reply(result["speech"], session)
+            outbox.put_nowait({"type": "done", "id": message_id, "reply": result["reply"], **audio})
+
+    writer = asyncio.create_task(pump())
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            kind = frame.get("type") if isinstance(frame, dict) else None
+            if kind == "ping":
+                outbox.put_nowait({"type": "pong"})
+            elif kind == "message":
+                # Turns wait on turn_lock before admission sees them: bound them here
+                if len(tasks) >= admission.max_per_client:
+                    outbox.put_nowait({"type": "error", "id": frame.get("id"), "status": 429,
+                                       "detail": "Too many messages in flight on this connection",
+                                       "retry_after": admission.retry_after()})
+                    continue
+                task = asyncio.create_task(answer(frame.get("id"), str(frame.get("text", ""))))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                outbox.put_nowait({"type": "error", "id": None, "status": 400,
+                                   "detail": f"Unknown frame type: {kind!r}"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except ValueError:
+        # Not JSON: protocol violation
+        await websocket.close(code=1003)
+    finally:
+        hub.disconnect(conn_id)
+        for task in (writer, *tasks):
+            task.cancel()
+
+@app.get("/history")
+def history_api(
+    cursor: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = QueryParam(50, ge=1, le=500),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    lang: Optional[str] = None,
+    speaker: Optional[str] = None
+):
+    """Keyset-paginated history, newest first; pass `next_cursor` back as `cursor`."""
+    return get_history_page(before_id=cursor, after_id=after, limit=limit,
+                            since=since, until=until, language=lang, speaker=speaker)
+
+@app.get("/history/export")
+def history_export_api(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    lang: Optional[str] = None,
+    speaker: Optional[str] = None
+):
+    """Stream matching history as NDJSON (one message per line, oldest first)."""
+    rows = iter_history(since=since, until=until, language=lang, speaker=speaker)
+    return StreamingResponse(
+        (json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=tron_history.ndjson"}
+    )
+
+@app.post("/history/reclaim")
+def history_reclaim_api(full: bool = False):
+    """Apply retention now (archiving expired rows) and give free space back."""
+    return reclaim_history_space(full=full)
+
+@app.get("/history/search")
+def history_search_api(
+    q: str,
+    speaker: Optional[str] = None,
+    lang: Optional[str] = None,
+    limit: int = QueryParam(20, ge=1, le=200)
+):
+    """Ranked full-text search over the conversation log."""
+    return {"query": q, "results": search_history(q, speaker=speaker, language=lang, limit=limit)}
 
 @app.post("/speak")
-def speak_api(data: Query):
-    if data.message.strip():
-        tts.speak(data.message)
-    return {"status": "speaking"}
+def speak_api(data: Query, x_session_id: Optional[str] = Header(None)):
+    # Identical texts already being spoken are joined, not synthesized again
+    audio = speak_reply(data.message, resolve_session(data, x_session_id))
+    return {"status": "speaking", **audio}
+
+@app.get("/audio/{audio_id}")
+def audio_api(audio_id: str):
+    """Audio (WAV or MP3) of a spoken reply (waits while it is still being synthesized)."""
+    audio = tts.audio(audio_id)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired audio id")
+    return Response(content=audio, media_type=audio_type(audio),
+                    headers={"Cache-Control": "public, max-age=86400, immutable"})
 
 # ===============================
 # START
@@ -190,26 +671,28 @@ def speak_api(data: Query):
 if __name__ == "__main__":
     print("\n" + "="*80)
     print("🤖 TRON v8.0 — BULLETPROOF VOICE SYSTEM")
-    print("   Primary: gTTS (Google)")
-    print("   Fallback: pyttsx3 (offline)")
-    print("   Last resort: Beep")
+    print("   Primary: Piper (offline, in-process)")
+    print("   Fallback: gTTS (Google)")
     print("   TRON will NEVER be silent!")
     print("="*80 + "\n")
 
+    profiler.report()
+
     if not authenticate():
         print("Authentication failed.")
         exit()
 
     tts.speak("TRON online. Voice system fully operational with fallbacks.")
 
-    # Start vision modules
-    threading.Thread(target=run_hand_mouse, daemon=True).start()
-    threading.Thread(target=run_perception, daemon=True).start()
-    threading.Thread(target=run_object_detector, daemon=True).start()
+    # Start vision modules (skip with --no-vision)
+    if VISION_ENABLED:
+        threading.Thread(target=run_hand_mouse, daemon=True).start()
+        threading.Thread(target=run_perception, daemon=True).start()
+        threading.Thread(target=run_object_detector, daemon=True).start()
 
     try:
         uvicorn.run(app, host=API_HOST, port=API_PORT)
     except KeyboardInterrupt:
-        tts.speak("Shutting down. Goodbye.")
+        tts.speak("Shutting down. Goodbye.", priority=PRIORITY_SYSTEM)
         time.sleep(2)
         print("\nTRON offline.")
@@ -0,0 +1,135 @@
+import os
+import json
+import atexit
+import tempfile
+import time
+import threading
+import metrics
+
+# ===============================
+# CONFIG
+# ===============================
+FLUSH_INTERVAL = 5.0  # seconds between background flushes of dirty state
+
+MEMORY_IO_SECONDS = metrics.histogram(
+    "tron_memory_io_seconds", "Memory file and journal I/O", ("op",))
+
+
+# ===============================
+# MEMORY STORE
+# ===============================
+class MemoryStore:
+    """
+    Keeps the assistant memory (facts) in RAM.
+
+    The file is read once on first access. Mutations only mark the store
+    dirty; a background timer writes the snapshot back with an atomic
+    rename, and a final flush runs at interpreter shutdown.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._data = None
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        atexit.register(self.close)
+
+    # -----------------------------
+    # LOAD
+    # -----------------------------
+    def _load(self):
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[MEMORY] Could not read {self.path}: {e}")
+                data = {}
+        data.setdefault("facts", {})
+        return data
+
+    @property
+    def data(self):
+        with self._lock:
+            if self._data is None:
+                with MEMORY_IO_SECONDS.time(op="load"):
+                    self._data = self._load()
+                self._start_flusher()
+            return self._data
+
+    @property
+    def facts(self):
+        return self.data["facts"]
+
+    # -----------------------------
+    # MUTATIONS
+    # -----------------------------
+    def mark_dirty(self):
+        with self._lock:
+            self._dirty = True
+
+    def set_fact(self, key, value):
+        """Store a fact; returns True if it changed."""
+        with self._lock:
+            if self.facts.get(key) == value:
+                return False
+            self.facts[key] = value
+            self._dirty = True
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self.data:
+                return default
+            self._dirty = True
+            return self.data.pop(key)
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+    def flush(self):
+        """Write the snapshot if dirty (tmp file + os.replace)."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty or self._data is None:
+                    return False
+                payload = json.dumps(self._data, indent=4, ensure_ascii=False)
+                self._dirty = False
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            tmp_path = None
+            started = time.perf_counter()
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=".memory_", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                MEMORY_IO_SECONDS.observe(time.perf_counter() - started, op="flush")
+                return True
+            except OSError as e:
+                print(f"[MEMORY] Flush failed: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                self.mark_dirty()
+                return False
+
+    def _start_flusher(self):
+        if self._flusher is not None or self.flush_interval <= 0:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
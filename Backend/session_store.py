@@ -0,0 +1,110 @@
+import time
+import threading
+from collections import OrderedDict
+
+from context_window import ContextWindow
+
+# ===============================
+# CONFIG
+# ===============================
+MAX_SESSIONS = 256
+IDLE_TIMEOUT = 30 * 60     # seconds without activity before a session is dropped
+DEFAULT_SESSION = "default"
+
+
+# ===============================
+# SESSION
+# ===============================
+class Session:
+    """Conversation state of one client: chat history and spoken language."""
+
+    def __init__(self, session_id, lang="en"):
+        self.id = session_id
+        self.history = ContextWindow()
+        self.lang = lang
+        self.last_seen = time.monotonic()
+
+
+# ===============================
+# SESSION STORE
+# ===============================
+class SessionStore:
+    """
+    Bounded LRU of live sessions.
+
+    get() returns the session for an id, creating it on first use and
+    rehydrating it through `loader(session)` (e.g. last turns from the
+    journal). Sessions idle for `idle_timeout` seconds, or the least
+    recently used ones beyond `max_sessions`, are evicted; they come back
+    from storage the next time their id is seen. Pinned sessions (the local
+    CLI one) are never evicted.
+    """
+
+    def __init__(self, loader=None, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT):
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id=None):
+        session_id = (session_id or DEFAULT_SESSION).strip()[:128] or DEFAULT_SESSION
+        now = time.monotonic()
+        with self._lock:
+            session = self._pinned.get(session_id)
+            if session is not None:
+                session.last_seen = now
+                return session
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = now
+                return session
+
+            session = Session(session_id)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+        self._load(session)
+        return session
+
+    def pin(self, session_id):
+        """Create (or adopt) a session that is exempt from eviction."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None) or self._pinned.get(session_id)
+            fresh = session is None
+            if fresh:
+                session = Session(session_id)
+            self._pinned[session_id] = session
+        if fresh:
+            self._load(session)
+        return session
+
+    def _load(self, session):
+        if self.loader is None:
+            return
+        try:
+            self.loader(session)
+        except Exception as e:
+            print(f"[SESSION] Could not rehydrate {session.id}: {e}")
+
+    def _evict_idle(self, now):
+        # Oldest sessions sit at the front of the OrderedDict
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen < self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live": len(self._sessions) + len(self._pinned),
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,84 @@
+import builtins
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+
+# ===============================
+# STARTUP PROFILER
+# ===============================
+class StartupProfiler:
+    """
+    Records how long startup spends importing and initializing things.
+
+    install() wraps builtins.__import__ so every module imported for the
+    first time gets its cumulative import time recorded. measure(label)
+    times explicit init steps (client construction, model loading, ...).
+    report() prints both tables, slowest first.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.imports = {}   # top-level module -> seconds
+        self.steps = []     # (label, seconds)
+        self.started = time.perf_counter()
+        self._original_import = None
+        self._local = threading.local()
+
+    def install(self):
+        if not self.enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition(".")[0]
+        depth = getattr(self._local, "depth", 0)
+        # Only time the outermost import of a module that is not loaded yet
+        if level or depth or top in sys.modules:
+            self._local.depth = depth + 1
+            try:
+                return self._original_import(name, globals, locals, fromlist, level)
+            finally:
+                self._local.depth = depth
+
+        self._local.depth = 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = 0
+            self.imports[top] = self.imports.get(top, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def measure(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.steps.append((label, time.perf_counter() - start))
+
+    def report(self, top=25):
+        if not self.enabled:
+            return
+        self.enabled = False  # report once
+        self.uninstall()
+        total = time.perf_counter() - self.started
+        print("\n" + "=" * 60)
+        print(f"⏱️  STARTUP PROFILE — {total * 1000:.0f} ms total")
+        print("-" * 60)
+        print("Imports (first import, cumulative):")
+        for name, secs in sorted(self.imports.items(), key=lambda kv: -kv[1])[:top]:
+            print(f"  {secs * 1000:9.1f} ms  {name}")
+        if self.steps:
+            print("Initialization:")
+            for label, secs in sorted(self.steps, key=lambda kv: -kv[1]):
+                print(f"  {secs * 1000:9.1f} ms  {label}")
+        print("=" * 60 + "\n")
@@ -0,0 +1,37 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_journal import ConversationJournal
+
+
+def test_concurrent_compactions_keep_every_append(tmp_path):
+    journal = ConversationJournal(str(tmp_path / "journal.jsonl"), compact_every=0)
+    stop = threading.Event()
+    appended = []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            journal.append({"i": i})
+            appended.append(i)
+            i += 1
+
+    def compactor():
+        for _ in range(5):
+            journal.compact()
+
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    compactors = [threading.Thread(target=compactor) for _ in range(2)]
+    for thread in compactors:
+        thread.start()
+    for thread in compactors:
+        thread.join()
+    stop.set()
+    writer_thread.join()
+    journal.close()
+
+    assert [entry["i"] for entry in journal] == appended
@@ -1,15 +1,89 @@
 # text_to_speech.py
-# Ultimate reliable TTS: gTTS + pygame with safe file handling
+# Ultimate reliable TTS: offline Piper with gTTS fallback, sentence by sentence from memory
 
+import hashlib
+import heapq
+import itertools
+import re
 import threading
-import tempfile
-import os
 import time
-from gtts import gTTS
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
 import pygame
+from dotenv import dotenv_values
+import audio_output
+import metrics
+from tts_cache import AudioCache
+from tts_engines import PRELOAD_ON_SWITCH, default_engines, join_clips
+
+env = dotenv_values(".env")
+
+# Synthesized replies kept in RAM so clients can fetch/replay them by id
+CLIP_CACHE_SIZE = 64
+# Every synthesized clip is also kept on disk, keyed by (text, lang, engine)
+CACHE_DIR = env.get("TTSCachePath") or "Data/tts_cache"
+CACHE_MAX_BYTES = int(float(env.get("TTSCacheMB", "50") or 50) * 1024 * 1024)
+# Fixed phrases synthesized in the background at startup ("|"-separated)
+STOCK_PHRASES = (
+    "TRON online. Voice system fully operational with fallbacks.|"
+    "Authentication required. Please enter the password.|"
+    "Authentication successful. Welcome back.|"
+    "Maximum attempts exceeded. System locked.|"
+    "Hand gesture control activated.|Vision perception online.|"
+    "Object detection ready.|Detected person|Shutting down. Goodbye."
+)
+PREWARM_PHRASES = [p.strip() for p in env.get("TTSPrewarm", STOCK_PHRASES).split("|") if p.strip()]
+
+# Playback priorities, lower plays first. Announcements are cut off by
+# anything more urgent; the others always finish
+PRIORITY_REPLY = 0        # answers to the user
+PRIORITY_SYSTEM = 10      # status messages (module ready, shutting down, ...)
+PRIORITY_ANNOUNCE = 20    # vision announcements, fine to skip or interrupt
+MAX_PENDING = int(env.get("TTSMaxPending", "16") or 16)   # utterances waiting to play
+SYNTH_WORKERS = 2         # clips synthesized ahead while another one plays
+# Replies are spoken sentence by sentence: the first one plays while the
+# next is synthesized. Fragments shorter than this join the next sentence
+MIN_SENTENCE_CHARS = 24
+POLL_INTERVAL = 0.02      # seconds between mixer checks (also the preemption latency)
+
+TTS_SECONDS = metrics.histogram(
+    "tron_tts_seconds", "Speech synthesis and playback time", ("stage",))
+TTS_REQUESTS = metrics.counter(
+    "tron_tts_requests_total", "Synthesis requests by how they were served", ("result",))
+TTS_PLAYBACK = metrics.counter(
+    "tron_tts_playback_total", "Utterances by what happened to them", ("result",))
+TTS_QUEUE_DEPTH = metrics.gauge(
+    "tron_tts_queue_depth", "Utterances waiting for the playback worker")
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।…])\s+|\n+")
+
+
+def clip_id(text: str, lang: str, engine: str) -> str:
+    """Stable id of the audio for `text` spoken in `lang` by `engine`."""
+    return hashlib.sha1(f"{engine}\0{lang}\0{text.strip()}".encode("utf-8")).hexdigest()[:16]
+
+
+def split_sentences(text: str) -> list:
+    """Split `text` into sentences, merging fragments shorter than MIN_SENTENCE_CHARS."""
+    sentences = []
+    fragment = ""
+    for part in _SENTENCE_END.split(text.strip()):
+        fragment = f"{fragment} {part.strip()}".strip()
+        if len(fragment) >= MIN_SENTENCE_CHARS:
+            sentences.append(fragment)
+            fragment = ""
+    if fragment:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {fragment}"
+        else:
+            sentences.append(fragment)
+    return sentences
+
 
 class TextToSpeech:
-    def __init__(self):
+    def __init__(self, prewarm=PREWARM_PHRASES, engines=None):
         self.lang_map = {
             "en": "en",
             "hi": "hi",
@@ -17,6 +91,31 @@ class TextToSpeech:
             "ta": "ta"
         }
         self.current_lang = "en"
+        # Tried in order per utterance: the first that supports the language
+        # speaks it, the ones after it are fallbacks (see tts_engines.py)
+        self.engines = default_engines() if engines is None else list(engines)
+
+        # One synthesis per distinct (text, lang): finished clips live in an
+        # LRU, in-flight ones are shared through a Future
+        self._clips = OrderedDict()   # clip id -> audio bytes
+        self._utterances = OrderedDict()  # multi-sentence clip id -> (lang, engine, [(sentence id, text)])
+        self._inflight = {}           # clip id -> Future
+        self._lock = threading.RLock()
+        # Called as listener(status, clip id) from the playback thread with
+        # status "started", "finished", "preempted" or "failed"
+        self.listeners = []
+
+        # One worker owns the mixer and plays the queue in priority order;
+        # a small pool synthesizes queued clips ahead of their turn
+        self._queue = []              # heap of (priority, seq, clip id); may hold stale entries
+        self._pending = {}            # clip id -> (priority, seq, (lang, engine, sentences, queued at)), the live queue
+        self._current = None          # (clip id, priority) being played
+        self._seq = itertools.count()
+        self._wakeup = threading.Condition(self._lock)
+        self._preempt = threading.Event()
+        self._counts = Counter()
+        self._synth_pool = ThreadPoolExecutor(SYNTH_WORKERS, thread_name_prefix="tts-synth")
+        self.cache = AudioCache(CACHE_DIR, CACHE_MAX_BYTES)
 
         # Initialize pygame mixer safely
         try:
@@ -25,48 +124,314 @@ class TextToSpeech:
         except Exception as e:
             print(f"pygame init failed: {e}")
 
-        print("🎙️ gTTS ready — Reliable Google voices with safe playback!")
+        print(f"🎙️ TTS engines: {' → '.join(engine.name for engine in self.engines)}")
+
+        threading.Thread(target=self._playback_loop, name="tts-playback", daemon=True).start()
+        if prewarm:
+            threading.Thread(target=self.prewarm, args=(prewarm,), daemon=True).start()
 
     def set_language(self, lang: str):
         if lang in self.lang_map:
             self.current_lang = lang
             print(f"TTS Language → {lang.upper()}")
+            self.prepare(lang)
 
-    def speak(self, text: str):
-        if not text or not text.strip():
-            return
+    def prepare(self, lang: str):
+        """A session is switching to `lang`: load its voices in the background."""
+        if PRELOAD_ON_SWITCH:
+            for engine in self.engines:
+                engine.preload(lang)
+
+    # -----------------------------
+    # SYNTHESIS
+    # -----------------------------
+    def _engine_for(self, lang: str):
+        """First engine that speaks `lang`, or None."""
+        for engine in self.engines:
+            if engine.supports(lang):
+                return engine
+        return None
+
+    def _request(self, text: str, lang: str, engine):
+        """(clip id, future with the audio, whether the caller must synthesize it)."""
+        key = clip_id(text, lang, engine.name)
+        with self._lock:
+            audio = self._clips.get(key)
+            if audio is not None:
+                self._clips.move_to_end(key)
+                future = Future()
+                future.set_result(audio)
+                TTS_REQUESTS.inc(result="cached")
+                return key, future, False
+            future = self._inflight.get(key)
+            if future is not None:
+                TTS_REQUESTS.inc(result="joined")
+                return key, future, False
+            future = self._inflight[key] = Future()
+            return key, future, True
+
+    def _fetch(self, text: str, lang: str, engine) -> Future:
+        """Future with the audio of one sentence, scheduling its synthesis if needed."""
+        key, future, owner = self._request(text, lang, engine)
+        if owner:
+            self._synth_pool.submit(self._synthesize, key, text, lang, engine, future)
+        return future
+
+    def _synthesize(self, key: str, text: str, lang: str, engine, future: Future):
+        audio = self.cache.get(key)
+        if audio is not None:
+            TTS_REQUESTS.inc(result="disk")
+        try:
+            if audio is None:
+                audio, used = self._run_engines(text, lang, engine)
+                # A fallback's audio is not what the key names: keep it out of the disk cache
+                if audio and used is engine:
+                    self.cache.put(key, audio)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if audio:
+                    self._clips[key] = audio
+                    while len(self._clips) > CLIP_CACHE_SIZE:
+                        self._clips.popitem(last=False)
+            future.set_result(audio)
+
+    def _run_engines(self, text: str, lang: str, engine):
+        """(audio, engine that made it) from `engine`, else the engines after it."""
+        for candidate in self.engines[self.engines.index(engine):]:
+            if not candidate.supports(lang):
+                continue
+            try:
+                with TTS_SECONDS.time(stage="synthesize"):
+                    audio = candidate.synthesize(text, lang)
+                TTS_REQUESTS.inc(result="synthesized" if candidate is engine else "fallback")
+                return audio, candidate
+            except Exception as e:
+                print(f"{candidate.name} TTS error: {e}")
+        TTS_REQUESTS.inc(result="failed")
+        return None, None
+
+    def synthesize(self, text: str, lang: str = None) -> Optional[bytes]:
+        """Audio for `text`; concurrent calls for the same text share one request."""
+        lang = lang if lang in self.lang_map else self.current_lang
+        engine = self._engine_for(lang)
+        if engine is None:
+            return None
+        key, future, owner = self._request(text, lang, engine)
+        if owner:
+            self._synthesize(key, text, lang, engine, future)
+        return future.result()
 
-        print(f"[TRON SPEAKING ({self.current_lang.upper()})]: {text}")
+    def audio(self, key: str, timeout: float = 30) -> Optional[bytes]:
+        """Audio of a clip returned by speak(), waiting for it if still synthesizing."""
+        with self._lock:
+            utterance = self._utterances.get(key)
+        if utterance is not None:
+            # The reply is its sentences back to back
+            lang, engine, sentences = utterance
+            try:
+                parts = [self._fetch(text, lang, engine).result(timeout) for _, text in sentences]
+            except FutureTimeout:
+                return None
+            return join_clips(parts) if all(parts) else None
 
-        def _play():
-            mp3_path = None
+        with self._lock:
+            audio = self._clips.get(key)
+            future = self._inflight.get(key)
+        if audio is None and future is not None:
             try:
-                tts_obj = gTTS(text=text, lang=self.lang_map.get(self.current_lang, "en"), slow=False)
+                audio = future.result(timeout)
+            except FutureTimeout:
+                return None
+        if audio is None:
+            # Fell out of the RAM LRU but may still be on disk
+            audio = self.cache.get(key)
+        return audio
+
+    def prewarm(self, phrases, lang: str = "en"):
+        """Make sure each phrase is in the disk cache (synthesizing the missing ones)."""
+        engine = self._engine_for(lang)
+        if engine is None:
+            return
+        # Playback fetches sentence clips, so those are what gets cached
+        missing = [
+            sentence for phrase in phrases for sentence in split_sentences(phrase)
+            if clip_id(sentence, lang, engine.name) not in self.cache
+        ]
+        for sentence in dict.fromkeys(missing):
+            self.synthesize(sentence, lang)
+        if missing:
+            print(f"🎙️ Pre-warmed {len(set(missing))} stock sentence(s) into the TTS cache")
+
+    # -----------------------------
+    # PLAYBACK QUEUE
+    # -----------------------------
+    def speak(self, text: str, lang: str = None, priority: int = PRIORITY_REPLY) -> Optional[str]:
+        """
+        Queue `text` for playback and return its clip id for audio(), or
+        None if the queue is full of more urgent speech. Only the first
+        sentence is synthesized up front; playback fetches each following
+        sentence while the previous one plays. Speaking a text
+        that is already queued or playing joins it (raising its priority if
+        needed) instead of repeating it. A new utterance more urgent than a
+        playing announcement cuts the announcement off.
+        """
+        if not text or not text.strip():
+            return None
+
+        # Per-call language (one per client session) overrides the default
+        lang = lang if lang in self.lang_map else self.current_lang
+        engine = self._engine_for(lang)
+        if engine is None:
+            return None
+        key = clip_id(text, lang, engine.name)
+        with self._lock:
+            if self._current and self._current[0] == key:
+                return self._coalesce(key)
+            queued = self._pending.get(key)
+            if queued is not None:
+                if priority < queued[0]:
+                    # Same place among its new peers: keep the original seq
+                    self._pending[key] = (priority, queued[1], queued[2])
+                    heapq.heappush(self._queue, (priority, queued[1], key))
+                    self._maybe_preempt(priority)
+                return self._coalesce(key)
+
+            if len(self._pending) >= MAX_PENDING:
+                # Make room by dropping the least urgent, most recent utterance
+                victim, (victim_priority, _, _) = max(
+                    self._pending.items(), key=lambda item: (item[1][0], item[1][1]))
+                if victim_priority <= priority:
+                    self._counts["dropped"] += 1
+                    TTS_PLAYBACK.inc(result="dropped")
+                    return None
+                del self._pending[victim]
+                self._counts["dropped"] += 1
+                TTS_PLAYBACK.inc(result="dropped")
+
+            print(f"[TRON SPEAKING ({lang.upper()})]: {text}")
+            sentences = [(clip_id(part, lang, engine.name), part) for part in split_sentences(text)]
+            if len(sentences) > 1 or sentences[0][0] != key:
+                # Served from its sentence clips (a lone sentence may still be
+                # a normalized form of the text, with a different id)
+                self._utterances[key] = (lang, engine, sentences)
+                while len(self._utterances) > CLIP_CACHE_SIZE:
+                    self._utterances.popitem(last=False)
+            self._fetch(sentences[0][1], lang, engine)
+            seq = next(self._seq)
+            self._pending[key] = (priority, seq, (lang, engine, sentences, time.perf_counter()))
+            heapq.heappush(self._queue, (priority, seq, key))
+            TTS_QUEUE_DEPTH.set(len(self._pending))
+            self._maybe_preempt(priority)
+            self._wakeup.notify()
+        return key
+
+    def clip_for(self, text: str, lang: str = None) -> Optional[str]:
+        """The clip id speak(text, lang) returns, without queueing anything."""
+        if not text or not text.strip():
+            return None
+        lang = lang if lang in self.lang_map else self.current_lang
+        engine = self._engine_for(lang)
+        return clip_id(text, lang, engine.name) if engine is not None else None
 
-                # Use unique temp file
-                tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-                mp3_path = tmp_file.name
-                tmp_file.close()
+    def _coalesce(self, key):
+        # Caller holds the lock
+        self._counts["coalesced"] += 1
+        TTS_PLAYBACK.inc(result="coalesced")
+        return key
 
-                tts_obj.save(mp3_path)
+    def _maybe_preempt(self, priority):
+        # Caller holds the lock
+        if self._current and self._current[1] >= PRIORITY_ANNOUNCE and priority < self._current[1]:
+            self._preempt.set()
 
-                # Play and wait
-                pygame.mixer.music.load(mp3_path)
-                pygame.mixer.music.play()
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
 
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "max_pending": MAX_PENDING,
+                "playing": self._current[0] if self._current else None,
+                **{result: self._counts[result]
+                   for result in ("played", "coalesced", "preempted", "dropped", "failed")},
+                "cache": self.cache.stats(),
+                "engines": {engine.name: engine.stats() for engine in self.engines},
+            }
 
+    def _next(self):
+        """Block until an utterance is due; returns (clip id, priority, future)."""
+        with self._wakeup:
+            while True:
+                while not self._pending:
+                    self._queue.clear()
+                    self._wakeup.wait()
+                priority, seq, key = heapq.heappop(self._queue)
+                entry = self._pending.get(key)
+                if entry is None or entry[:2] != (priority, seq):
+                    continue   # superseded by a priority bump, or dropped
+                del self._pending[key]
+                TTS_QUEUE_DEPTH.set(len(self._pending))
+                self._current = (key, priority)
+                self._preempt.clear()
+                return key, priority, entry[2]
+
+    def _playback_loop(self):
+        while True:
+            key, priority, utterance = self._next()
+            try:
+                status = self._play(key, *utterance)
+            except Exception as e:
+                print(f"Playback error: {e}")
+                status = "failed"
+            with self._lock:
+                self._current = None
+                self._counts["played" if status == "finished" else status] += 1
+            TTS_PLAYBACK.inc(result="played" if status == "finished" else status)
+            self._notify(status, key)
+
+    def _notify(self, status, key):
+        for listener in list(self.listeners):
+            try:
+                listener(status, key)
             except Exception as e:
-                print(f"gTTS error: {e}")
-            finally:
-                # Safe cleanup after playback
-                if mp3_path and os.path.exists(mp3_path):
-                    try:
-                        # Wait a moment before deleting
-                        time.sleep(0.2)
-                        os.unlink(mp3_path)
-                    except Exception as e:
-                        print(f"Cleanup error: {e}")
-
-        threading.Thread(target=_play, daemon=True).start()
\ No newline at end of file
+                print(f"TTS listener error: {e}")
+
+    # -----------------------------
+    # PLAYBACK
+    # -----------------------------
+    def _wait_audio(self, future) -> Optional[bytes]:
+        """The sentence's mp3 once synthesized, or None if preempted while waiting."""
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL)
+            except FutureTimeout:
+                if self._preempt.is_set():
+                    return None
+
+    def _play(self, key, lang, engine, sentences, queued_at) -> str:
+        """Play an utterance (playback thread only); returns its final status."""
+        upcoming = self._fetch(sentences[0][1], lang, engine)
+        for i in range(len(sentences)):
+            future = upcoming
+            if i + 1 < len(sentences):
+                # Synthesize the next sentence while this one plays
+                upcoming = self._fetch(sentences[i + 1][1], lang, engine)
+
+            audio = self._wait_audio(future)
+            if self._preempt.is_set():
+                return "preempted"
+            if not audio:
+                return "failed"
+
+            if i == 0:
+                TTS_SECONDS.observe(time.perf_counter() - queued_at, stage="first_audio")
+                self._notify("started", key)
+
+            # Straight from memory: no temp file to write, unlock or delete
+            with TTS_SECONDS.time(stage="playback"):
+                if not audio_output.play(audio, self._preempt, POLL_INTERVAL):
+                    return "preempted"
+        return "finished"
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import metrics
+
+TTS_CACHE_BYTES = metrics.gauge(
+    "tron_tts_cache_bytes", "Bytes of synthesized audio cached on disk")
+TTS_CACHE_LOOKUPS = metrics.counter(
+    "tron_tts_cache_lookups_total", "Disk audio cache lookups", ("result",))
+
+
+# ===============================
+# AUDIO CACHE
+# ===============================
+class AudioCache:
+    """
+    Content-addressed audio on disk: one file per clip id, named after it.
+
+    The index (clip id -> size, least recently used first) lives in memory
+    and is rebuilt from the directory at startup, oldest mtime first, so a
+    lookup never lists the directory. Hits bump the file's mtime to keep
+    the order across restarts. When the total goes over `max_bytes` the
+    least recently used files are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".clip"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index = OrderedDict()   # clip id -> size in bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load_index(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(self.suffix)], stat.st_size))
+            elif entry.name.endswith(".tmp"):
+                # Leftover of a write interrupted by a crash
+                os.unlink(entry.path)
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                TTS_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            # Deleted behind our back: forget it
+            with self._lock:
+                self._bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            TTS_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        with self._lock:
+            self.hits += 1
+        TTS_CACHE_LOOKUPS.inc(result="hit")
+        return audio
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        # Write to a temp file and rename, so readers never see half a clip
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"TTS cache write error: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        with self._lock:
+            self._bytes += len(audio) - self._index.pop(key, 0)
+            self._index[key] = len(audio)
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+        TTS_CACHE_BYTES.set(self._bytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "clips": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
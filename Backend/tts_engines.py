@@ -0,0 +1,269 @@
+import io
+import os
+import threading
+import wave
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+from dotenv import dotenv_values
+import metrics
+
+env = dotenv_values(".env")
+
+# ===============================
+# CONFIG
+# ===============================
+# Offline Piper voices by language: PiperModel_<lang>=path/to/voice.onnx
+# (the voice's .onnx.json must sit next to it)
+PIPER_MODELS = {"en": "models/en_US-amy-medium.onnx"}
+PIPER_MODELS.update({
+    key[len("PiperModel_"):]: value
+    for key, value in env.items() if key.startswith("PiperModel_") and value
+})
+# Engines tried in order for every utterance; later ones are fallbacks
+ENGINE_ORDER = [name.strip() for name in (env.get("TTSEngines") or "piper,gtts").split(",") if name.strip()]
+# RAM for resident Piper voices (estimated from model file sizes); cold ones are evicted
+VOICE_BUDGET_BYTES = int(float(env.get("PiperVoiceBudgetMB", "400") or 400) * 1024 * 1024)
+# Load a language's voice in the background as soon as a session switches to it
+PRELOAD_ON_SWITCH = (env.get("PiperPreloadOnSwitch") or "1").strip().lower() not in ("0", "false", "no")
+
+VOICE_LOAD_SECONDS = metrics.histogram(
+    "tron_piper_voice_load_seconds", "Time to load a Piper voice model")
+VOICE_RESIDENT_BYTES = metrics.gauge(
+    "tron_piper_voice_bytes", "Estimated memory of resident Piper voices")
+
+
+def audio_type(audio: bytes) -> str:
+    """MIME type of a clip produced by one of the engines."""
+    return "audio/wav" if audio[:4] == b"RIFF" else "audio/mpeg"
+
+
+def join_clips(parts) -> Optional[bytes]:
+    """One clip from consecutive sentence clips (None if they mix formats)."""
+    if not all(part[:4] == b"RIFF" for part in parts):
+        # MP3 frames can simply be concatenated; WAV headers can't
+        return None if any(part[:4] == b"RIFF" for part in parts) else b"".join(parts)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as out:
+        for i, part in enumerate(parts):
+            with wave.open(io.BytesIO(part)) as clip:
+                if i == 0:
+                    out.setparams(clip.getparams())
+                out.writeframes(clip.readframes(clip.getnframes()))
+    return buf.getvalue()
+
+
+# ===============================
+# VOICE POOL
+# ===============================
+class VoicePool:
+    """
+    Piper voices by language, loaded on first use and kept resident while
+    they fit in `budget_bytes` (each voice is charged its model file size).
+    Loading one past the budget evicts the least recently used others; the
+    voice just loaded always stays. Concurrent requests for a voice that
+    is loading share one load. A model that fails to load is not retried.
+    """
+
+    def __init__(self, models=None, budget_bytes=VOICE_BUDGET_BYTES):
+        self.models = dict(PIPER_MODELS if models is None else models)
+        self.budget_bytes = budget_bytes
+        self._voices = OrderedDict()   # lang -> (voice, bytes), least recently used first
+        self._loading = {}             # lang -> Future of the voice being loaded
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def supports(self, lang: str) -> bool:
+        return lang in self.models and lang not in self._failed
+
+    def get(self, lang: str):
+        """The voice for `lang`, loading it if needed (blocks); None if unavailable."""
+        with self._lock:
+            entry = self._voices.get(lang)
+            if entry is not None:
+                self._voices.move_to_end(lang)
+                self._counts["hits"] += 1
+                return entry[0]
+            if not self.supports(lang):
+                return None
+            future = self._loading.get(lang)
+            owner = future is None
+            if owner:
+                future = self._loading[lang] = Future()
+        if owner:
+            self._load(lang, future)
+        return future.result()
+
+    def preload(self, lang: str):
+        """Start loading `lang` in the background unless it is resident or loading."""
+        with self._lock:
+            if lang in self._voices or lang in self._loading or not self.supports(lang):
+                return
+        threading.Thread(target=self.get, args=(lang,), name=f"piper-preload-{lang}", daemon=True).start()
+
+    def _load(self, lang: str, future: Future):
+        voice = None
+        path = self.models[lang]
+        try:
+            from piper.voice import PiperVoice  # heavy (onnxruntime); import on load
+            with VOICE_LOAD_SECONDS.time():
+                voice = PiperVoice.load(path)
+            print(f"✅ Loaded Piper voice: {path}")
+        except Exception as e:
+            print(f"❌ Failed to load Piper model {path}: {e}")
+        finally:
+            with self._lock:
+                self._loading.pop(lang, None)
+                if voice is None:
+                    self._failed.add(lang)
+                else:
+                    self._voices[lang] = (voice, os.path.getsize(path) if os.path.exists(path) else 0)
+                    self._counts["loads"] += 1
+                    self._evict(keep=lang)
+            future.set_result(voice)
+
+    def _resident_bytes(self) -> int:
+        return sum(size for _, size in self._voices.values())
+
+    def _evict(self, keep: str):
+        # Caller holds the lock. In-flight syntheses keep their own reference
+        total = self._resident_bytes()
+        for lang in list(self._voices):
+            if total <= self.budget_bytes:
+                break
+            if lang == keep:
+                continue
+            _, size = self._voices.pop(lang)
+            total -= size
+            self._counts["evictions"] += 1
+            print(f"Piper voice '{lang}' evicted (voice budget)")
+        VOICE_RESIDENT_BYTES.set(total)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": list(self._voices),
+                "loading": list(self._loading),
+                "failed": sorted(self._failed),
+                "bytes": self._resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+                **{name: self._counts[name] for name in ("hits", "loads", "evictions")},
+            }
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool() -> VoicePool:
+    """The process-wide pool, so every Piper user shares the loaded voices."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = VoicePool()
+        return _shared_pool
+
+
+# ===============================
+# ENGINES
+# ===============================
+class TTSEngine:
+    """
+    A speech synthesizer. synthesize() returns one complete clip (MP3 or
+    WAV, see audio_type) for a sentence. The engine's name is part of the
+    clip id, so clips of different engines never collide in the caches.
+    """
+
+    name = "base"
+
+    def supports(self, lang: str) -> bool:
+        return True
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        raise NotImplementedError
+
+    def preload(self, lang: str):
+        """Get ready to speak `lang` soon (in the background; optional)."""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class GTTSEngine(TTSEngine):
+    """Google voices over the network (MP3)."""
+
+    name = "gtts"
+    LANGS = {"en", "hi", "te", "ta"}
+
+    def supports(self, lang: str) -> bool:
+        return lang in self.LANGS
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        from gtts import gTTS  # imported on first utterance
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class PiperEngine(TTSEngine):
+    """
+    Offline Piper voices, run in-process (16-bit mono WAV). Raw PCM comes
+    straight out of the loaded PiperVoice: no temp files, no subprocess.
+    Voices come from a VoicePool (the shared one by default). A language
+    whose model fails to load is reported as unsupported, so TextToSpeech
+    falls back to the next engine.
+    """
+
+    name = "piper"
+
+    def __init__(self, pool=None, preload=("en",)):
+        self.pool = pool if pool is not None else shared_pool()
+        for lang in preload:
+            if self.pool.supports(lang):
+                self.pool.get(lang)
+
+    def supports(self, lang: str) -> bool:
+        return self.pool.supports(lang)
+
+    def voice(self, lang: str):
+        """The loaded voice for `lang` (loading it on first use), or None."""
+        return self.pool.get(lang)
+
+    def preload(self, lang: str):
+        self.pool.preload(lang)
+
+    def stats(self) -> dict:
+        return self.pool.stats()
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        voice = self._require(lang)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(voice.config.sample_rate)
+            for chunk in voice.synthesize(text):
+                wav.writeframes(chunk.audio_int16_bytes)
+        return buf.getvalue()
+
+    def _require(self, lang: str):
+        voice = self.voice(lang)
+        if voice is None:
+            raise RuntimeError(f"No Piper voice for '{lang}'")
+        return voice
+
+
+ENGINES = {"piper": PiperEngine, "gtts": GTTSEngine}
+
+
+def default_engines():
+    """Engine instances in ENGINE_ORDER (unknown names are skipped)."""
+    engines = []
+    for name in ENGINE_ORDER:
+        if name in ENGINES:
+            engines.append(ENGINES[name]())
+        else:
+            print(f"Unknown TTS engine '{name}' in TTSEngines, skipped")
+    return engines or [GTTSEngine()]
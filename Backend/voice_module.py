@@ -1,34 +1,35 @@
-import wave
-import tempfile
-import subprocess
 import threading
-from piper.voice import PiperVoice
+
+import audio_output
+from tts_engines import PRELOAD_ON_SWITCH, PiperEngine
 
 # ==================================================
 # CONFIG
 # ==================================================
-TTS_MODEL_EN = "models/en_US-amy-medium.onnx"  # Change if you add more languages
-
 LANG_CONFIRM = {
     "en": "Language switched to English.",
     "hi": "Language switched to Hindi. Voice will remain in English style for now.",
 }
 
-class TronAssistant:  # ← MUST be TronAssistant to match main.py import
+def detect_language_switch(command: str):
+    """Return the language a command asks to switch to ("en"/"hi"), or None."""
+    cmd = command.lower()
+    if any(word in cmd for word in ["english", "इंग्लिश"]):
+        return "en"
+    if any(word in cmd for word in ["hindi", "हिंदी"]):
+        return "hi"
+    return None
+
+
+class TronAssistant:  # Standalone offline voice (enroll_voice.py); the server speaks through TextToSpeech
     def __init__(self):
         self.current_lang = "en"
-        self.voice = None
-        self._load_voice()
-        print("🎧 Piper TTS loaded - High-quality offline voice ready!")
-
-    def _load_voice(self):
-        try:
-            self.voice = PiperVoice.load(TTS_MODEL_EN)
-            print(f"✅ Loaded Piper voice: {TTS_MODEL_EN}")
-        except Exception as e:
-            print(f"❌ Failed to load Piper model: {e}")
+        self.engine = PiperEngine()
+        self.voice = self.engine.voice("en")
+        if self.voice is not None:
+            print("🎧 Piper TTS loaded - High-quality offline voice ready!")
+        else:
             print("   Make sure en_US-amy-medium.onnx and .json are in ./models/")
-            self.voice = None
 
     def speak(self, text: str):
         if not text or not text.strip() or self.voice is None:
@@ -36,38 +37,24 @@ class TronAssistant:  # ← MUST be TronAssistant to match main.py import
 
         print(f"[TRON SPEAKING]: {text}")
 
+        # Languages without a Piper voice keep the English one
+        lang = self.current_lang if self.engine.supports(self.current_lang) else "en"
         try:
-            # Generate WAV in memory
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                wav_path = tmp.name
-
-            with wave.open(wav_path, "wb") as wav_file:
-                self.voice.synthesize_wav(text, wav_file)
-
-            # Play audio on Windows (no popup window)
-            subprocess.run([
-                "powershell", "-c",
-                f"(New-Object Media.SoundPlayer '{wav_path}').PlaySync(); Remove-Item '{wav_path}' -Force"
-            ], creationflags=subprocess.CREATE_NO_WINDOW)
-
+            # PCM from the loaded voice straight to the audio device
+            audio_output.play(self.engine.synthesize(text, lang), threading.Event())
         except Exception as e:
             print("❌ Speech playback failed:", e)
 
     def switch_language(self, command: str):
-        cmd = command.lower()
-        new_lang = None
-
-        if any(word in cmd for word in ["english", "इंग्लिश"]):
-            new_lang = "en"
-        elif any(word in cmd for word in ["hindi", "हिंदी"]):
-            new_lang = "hi"
+        new_lang = detect_language_switch(command)
 
         if new_lang and new_lang != self.current_lang:
             self.current_lang = new_lang
+            if PRELOAD_ON_SWITCH:
+                self.engine.preload(new_lang)
             confirm = LANG_CONFIRM.get(new_lang, "Language updated.")
             # Speak confirmation in background
             threading.Thread(target=self.speak, args=(confirm,), daemon=True).start()
             return new_lang, confirm
 
         return None, None
-
@@ -0,0 +1,64 @@
+import asyncio
+import itertools
+import threading
+
+import metrics
+
+WS_CONNECTIONS = metrics.gauge(
+    "tron_ws_connections", "Open WebSocket connections")
+WS_EVENTS = metrics.counter(
+    "tron_ws_events_total", "Events pushed to WebSocket clients", ("type",))
+
+
+# ===============================
+# CONNECTION HUB
+# ===============================
+class ConnectionHub:
+    """
+    Registry of open WebSocket connections and their outbound queues.
+
+    Each connection drains its own asyncio.Queue on its event loop, so
+    every frame for a socket goes through a single writer. publish() may
+    be called from any thread (TTS playback, reminder timers, ...): events
+    are handed to the owning loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._connections = {}   # conn id -> (session id, queue, loop)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def connect(self, session_id):
+        """Register the calling connection; returns (conn id, outbound queue)."""
+        outbox = asyncio.Queue()
+        conn_id = next(self._ids)
+        with self._lock:
+            self._connections[conn_id] = (session_id, outbox, asyncio.get_running_loop())
+            WS_CONNECTIONS.set(len(self._connections))
+        return conn_id, outbox
+
+    def disconnect(self, conn_id):
+        with self._lock:
+            self._connections.pop(conn_id, None)
+            WS_CONNECTIONS.set(len(self._connections))
+
+    def publish(self, event, session_id=None):
+        """Push `event` to every connection, or only to those of `session_id`."""
+        with self._lock:
+            targets = [
+                (outbox, loop) for sid, outbox, loop in self._connections.values()
+                if session_id is None or sid == session_id
+            ]
+        for outbox, loop in targets:
+            try:
+                loop.call_soon_threadsafe(outbox.put_nowait, event)
+            except RuntimeError:
+                # Loop already closed (server shutting down)
+                continue
+        if targets:
+            WS_EVENTS.inc(len(targets), type=event.get("type", "unknown"))
+
+    def stats(self):
+        with self._lock:
+            sessions = {sid for sid, _, _ in self._connections.values()}
+            return {"connections": len(self._connections), "sessions": len(sessions)}
@@ -2,9 +2,14 @@
 
 import { useState, useRef, useEffect } from "react";
 
+const API_URL = "http://127.0.0.1:8000";
+const WS_URL = "ws://127.0.0.1:8000/ws";
+
+type Message = { role: "user" | "tron"; text: string; audio?: string; id?: string };
+
 export default function Page() {
   const [input, setInput] = useState("");
-  const [messages, setMessages] = useState<{ role: "user" | "tron"; text: string }[]>([
+  const [messages, setMessages] = useState<Message[]>([
     { role: "tron", text: "Tron is online. Press and hold 🎤 to talk." },
   ]);
   const [isListening, setIsListening] = useState(false);
@@ -12,8 +17,80 @@ export default function Page() {
   const [currentLang, setCurrentLang] = useState("en"); // Track language for mic
 
   const chatRef = useRef<HTMLDivElement>(null);
+  const sessionId = useRef<string>("");
+  const socket = useRef<WebSocket | null>(null);
   let recognition: any = null;
 
+  // One backend session per browser, so history and language are not shared
+  useEffect(() => {
+    let id = localStorage.getItem("tron-session-id");
+    if (!id) {
+      id = crypto.randomUUID();
+      localStorage.setItem("tron-session-id", id);
+    }
+    sessionId.current = id;
+  }, []);
+
+  // Update the TRON message that answers request `id`
+  const updateReply = (id: string, update: (msg: Message) => Message) =>
+    setMessages((prev) => prev.map((msg) => (msg.id === id && msg.role === "tron" ? update(msg) : msg)));
+
+  // One WebSocket carries chat, streamed tokens, speech status and notifications.
+  // Reconnects with backoff; while it is down, sendMessage falls back to HTTP.
+  useEffect(() => {
+    let retry = 0;
+    let timer: ReturnType<typeof setTimeout>;
+    let closed = false;
+
+    const connect = () => {
+      const ws = new WebSocket(`${WS_URL}?session_id=${encodeURIComponent(sessionId.current)}`);
+      socket.current = ws;
+
+      ws.onopen = () => {
+        retry = 0;
+      };
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        switch (data.type) {
+          case "token":
+            updateReply(data.id, (msg) => ({ ...msg, text: msg.text + data.token }));
+            break;
+          case "done":
+            updateReply(data.id, (msg) => ({
+              ...msg,
+              text: data.reply,
+              audio: data.audio_url && `${API_URL}${data.audio_url}`,
+            }));
+            break;
+          case "error":
+            if (data.id) {
+              const wait = data.retry_after ? ` Try again in ${data.retry_after}s.` : "";
+              updateReply(data.id, (msg) => ({ ...msg, text: `⚠️ ${data.detail}.${wait}` }));
+            }
+            break;
+          case "speech":
+            setIsSpeaking(data.status === "started");
+            break;
+          case "notification":
+            setMessages((prev) => [...prev, { role: "tron", text: `🔔 ${data.message}` }]);
+            break;
+        }
+      };
+      ws.onclose = () => {
+        if (socket.current === ws) socket.current = null;
+        if (closed) return;
+        timer = setTimeout(connect, Math.min(1000 * 2 ** retry++, 30000));
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      socket.current?.close();
+    };
+  }, []);
+
   useEffect(() => {
     if (chatRef.current) {
       chatRef.current.scrollTop = chatRef.current.scrollHeight;
@@ -24,37 +101,75 @@ export default function Page() {
     if (!text.trim()) return;
 
     const userText = text.trim();
-    setMessages((prev) => [...prev, { role: "user", text: userText }]);
+    const id = crypto.randomUUID();
+    setMessages((prev) => [...prev, { role: "user", text: userText, id }]);
     setInput("");
 
+    const ws = socket.current;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      setMessages((prev) => [...prev, { role: "tron", text: "", id }]);
+      ws.send(JSON.stringify({ type: "message", id, text: userText }));
+      return;
+    }
+    await streamOverHttp(userText, id);
+  };
+
+  // Fallback while the socket is reconnecting: Server-Sent Events over POST
+  const streamOverHttp = async (userText: string, id: string) => {
     try {
-      const res = await fetch("http://127.0.0.1:8000/tron", {
+      const res = await fetch(`${API_URL}/tron/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: userText }),
+        body: JSON.stringify({ message: userText, session_id: sessionId.current }),
       });
 
-      if (!res.ok) throw new Error("Backend error");
+      if (!res.ok || !res.body) throw new Error("Backend error");
 
-      const data = await res.json();
-      const reply = data.reply;
+      // Show the reply as it streams in (Server-Sent Events)
+      setMessages((prev) => [...prev, { role: "tron", text: "", id }]);
 
-      setMessages((prev) => [...prev, { role: "tron", text: reply }]);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let reply = "";
+      let audio: string | undefined;
 
-      // Auto-speak reply
-      setIsSpeaking(true);
-      await fetch("http://127.0.0.1:8000/speak", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: reply }),
-      });
-      setIsSpeaking(false);
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+        for (const event of events) {
+          const dataLine = event.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+          if (event.startsWith("event: done")) {
+            reply = data.reply;
+            audio = data.audio_url && `${API_URL}${data.audio_url}`;
+          } else {
+            reply += data.token;
+          }
+          updateReply(id, (msg) => ({ ...msg, text: reply, audio }));
+        }
+      }
+      // The backend already speaks the reply; audio_url only serves replays
     } catch (err) {
       setMessages((prev) => [...prev, { role: "tron", text: "⚠️ Cannot connect to TRON." }]);
       setIsSpeaking(false);
     }
   };
 
+  // Replay fetches the already-synthesized clip instead of synthesizing again
+  const replay = (url: string) => {
+    const player = new Audio(url);
+    setIsSpeaking(true);
+    player.onended = () => setIsSpeaking(false);
+    player.onerror = () => setIsSpeaking(false);
+    player.play().catch(() => setIsSpeaking(false));
+  };
+
   const startListening = () => {
     const SpeechRecognition =
       (window as any).SpeechRecognition || (window as any).webkitSpeechRecognition;
@@ -94,6 +209,11 @@ export default function Page() {
             {messages.map((msg, i) => (
               <div key={i} className={msg.role === "tron" ? "tron-msg" : "user-msg"}>
                 <strong>{msg.role === "user" ? "You" : "TRON"}:</strong> {msg.text}
+                {msg.role === "tron" && msg.audio && (
+                  <button className="replay-btn" onClick={() => replay(msg.audio!)} title="Replay">
+                    🔁
+                  </button>
+                )}
                 {msg.role === "tron" && isSpeaking && <span> 🔊 Speaking...</span>}
               </div>
             ))}
@@ -1,3 +1,47 @@
+// One backend session per browser, so history and language are not shared
+function getSessionId() {
+  let id = localStorage.getItem("tron-session-id");
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem("tron-session-id", id);
+  }
+  return id;
+}
+
+/* WEBSOCKET: chat, streamed tokens and pushed notifications over one connection */
+let socket = null;
+let retry = 0;
+const replies = {};  // message id -> span receiving its tokens
+
+function connect() {
+  const ws = new WebSocket(`ws://127.0.0.1:8000/ws?session_id=${encodeURIComponent(getSessionId())}`);
+  socket = ws;
+
+  ws.onopen = () => { retry = 0; };
+  ws.onmessage = (event) => {
+    const data = JSON.parse(event.data);
+    const chatbox = document.getElementById("chatbox");
+    const span = replies[data.id];
+
+    if (data.type === "token" && span) {
+      span.textContent += data.token;
+    } else if (data.type === "done" && span) {
+      span.textContent = data.reply;
+      delete replies[data.id];
+    } else if (data.type === "error" && span) {
+      span.textContent = `⚠️ ${data.detail}`;
+      delete replies[data.id];
+    } else if (data.type === "notification") {
+      chatbox.append(`🔔 ${data.message}\n\n`);
+    }
+    chatbox.scrollTop = chatbox.scrollHeight;
+  };
+  ws.onclose = () => {
+    if (socket === ws) socket = null;
+    setTimeout(connect, Math.min(1000 * 2 ** retry++, 30000));
+  };
+}
+
 async function sendMessage() {
   const input = document.querySelector(".chat-input input");
   const chatbox = document.getElementById("chatbox");
@@ -6,29 +50,41 @@ async function sendMessage() {
   if (!message) return;
 
   // Show user message
-  chatbox.innerHTML += `\nYou: ${message}\n`;
+  chatbox.append(`\nYou: ${message}\n`);
   chatbox.scrollTop = chatbox.scrollHeight;
   input.value = "";
 
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    const id = crypto.randomUUID();
+    const span = document.createElement("span");
+    replies[id] = span;
+    chatbox.append("TRON: ", span, "\n\n");
+    socket.send(JSON.stringify({ type: "message", id, text: message }));
+    return;
+  }
+
+  // Socket down (reconnecting): plain HTTP
   try {
     const response = await fetch("http://127.0.0.1:8000/tron", {
       method: "POST",
       headers: {
         "Content-Type": "application/json"
       },
-      body: JSON.stringify({ message })
+      body: JSON.stringify({ message, session_id: getSessionId() })
     });
 
     const data = await response.json();
 
-    chatbox.innerHTML += `TRON: ${data.reply}\n\n`;
+    chatbox.append(`TRON: ${data.reply}\n\n`);
     chatbox.scrollTop = chatbox.scrollHeight;
 
   } catch (error) {
-    chatbox.innerHTML += "⚠️ Unable to connect to TRON backend.\n";
+    chatbox.append("⚠️ Unable to connect to TRON backend.\n");
   }
 }
 
+connect();
+
 /* ENTER KEY SUPPORT */
 document.addEventListener("keydown", (e) => {
   if (e.key === "Enter") {